@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the checkout write path: per-row ItemRepository.update / BuyItemRepository.create_many
+against their executemany variants, on an in-memory SQLite database.
+
+Usage: python -m benchmarks.bulk_writes [rows]
+"""
+import asyncio
+import sys
+import time
+from dataclasses import asdict
+
+from sqlalchemy import update, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from models.base import Base
+from models.buy import Buy
+from models.buyItem import BuyItem, BuyItemDTO
+from models.category import Category
+from models.item import Item, ItemDTO
+from models.subcategory import Subcategory
+from models.user import User
+from repositories.buyItem import BuyItemRepository
+from repositories.item import ItemRepository, item_columns, to_item_dto
+
+
+async def legacy_update(item_dto_list: list[ItemDTO], session: AsyncSession):
+    for item in item_dto_list:
+        stmt = update(Item).where(Item.id == item.id).values(**asdict(item))
+        await session.execute(stmt)
+
+
+async def legacy_create_many(buy_item_dto_list: list[BuyItemDTO], session: AsyncSession):
+    for buy_item_dto in buy_item_dto_list:
+        session.add(BuyItem(**buy_item_dto.model_dump()))
+    await session.flush()
+
+
+async def prepare(rows: int) -> async_sessionmaker:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        session.add_all([User(telegram_id=1), Category(name="Category"), Subcategory(name="Subcategory")])
+        await session.flush()
+        session.add(Buy(buyer_id=1, quantity=rows, total_price=float(rows)))
+        session.add_all([Item(category_id=1, subcategory_id=1, private_data="x" * 256, price=1.0,
+                              description="Description") for _ in range(rows)])
+        await session.commit()
+    return session_maker
+
+
+async def measure(session_maker: async_sessionmaker, update_function, create_function, rows: int) -> float:
+    async with session_maker() as session:
+        items = [to_item_dto(item) for item in (await session.execute(select(*item_columns))).all()]
+        for item in items:
+            item.is_sold = True
+        buy_items = [BuyItemDTO(buy_id=1, item_id=item.id) for item in items[:rows]]
+        start = time.perf_counter()
+        await update_function(items, session)
+        await create_function(buy_items, session)
+        elapsed = time.perf_counter() - start
+        await session.rollback()
+        return elapsed
+
+
+async def main(rows: int):
+    session_maker = await prepare(rows)
+    legacy = await measure(session_maker, legacy_update, legacy_create_many, rows)
+    bulk = await measure(session_maker, ItemRepository.update, BuyItemRepository.create_many, rows)
+    print(f"rows: {rows}")
+    print(f"per-row: {legacy * 1000:.1f} ms ({legacy / rows * 1e6:.1f} us/row)")
+    print(f"bulk:    {bulk * 1000:.1f} ms ({bulk / rows * 1e6:.1f} us/row)")
+    print(f"speedup: {legacy / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
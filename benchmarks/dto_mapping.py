@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of the read path: mapping item lists to a pydantic model from ORM entities
+with model_validate(from_attributes=True) or model_construct, or from column rows validated
+as mappings, against the slotted dataclass ItemDTO built from column rows,
+on an in-memory SQLite database.
+
+Usage: python -m benchmarks.dto_mapping [rows]
+"""
+import asyncio
+import sys
+import time
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import undefer
+
+from models.base import Base
+from models.category import Category
+from models.item import Item, ItemDTO
+from models.subcategory import Subcategory
+from repositories.item import item_columns, to_item_dto
+
+
+class ItemModel(BaseModel):
+    id: int | None = None
+    category_id: int | None = None
+    subcategory_id: int | None = None
+    private_data: str | None = None
+    price: float | None = None
+    is_sold: bool | None = None
+    is_new: bool | None = None
+    description: str | None = None
+
+
+async def prepare(rows: int) -> async_sessionmaker:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        session.add_all([Category(name="Category"), Subcategory(name="Subcategory")])
+        await session.flush()
+        session.add_all([Item(category_id=1, subcategory_id=1, private_data="x" * 256, price=1.0,
+                              description="Description") for _ in range(rows)])
+        await session.commit()
+    return session_maker
+
+
+async def entities_validate(session: AsyncSession) -> list:
+    items = await session.execute(select(Item).options(undefer(Item.private_data)))
+    return [ItemModel.model_validate(item, from_attributes=True) for item in items.scalars().all()]
+
+
+async def entities_construct(session: AsyncSession) -> list:
+    items = await session.execute(select(Item).options(undefer(Item.private_data)))
+    return [ItemModel.model_construct(**{name: getattr(item, name) for name in ItemModel.model_fields})
+            for item in items.scalars().all()]
+
+
+async def rows_validate(session: AsyncSession) -> list:
+    items = await session.execute(select(*item_columns))
+    return [ItemModel.model_validate(item) for item in items.mappings().all()]
+
+
+async def rows_dataclass(session: AsyncSession) -> list:
+    items = await session.execute(select(*item_columns))
+    return [to_item_dto(item) for item in items.all()]
+
+
+async def measure(session_maker: async_sessionmaker, read_function, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        async with session_maker() as session:
+            start = time.perf_counter()
+            await read_function(session)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(rows: int):
+    session_maker = await prepare(rows)
+    baseline = await measure(session_maker, entities_validate)
+    print(f"{rows} rows, best of 5")
+    for read_function in (entities_validate, entities_construct, rows_validate, rows_dataclass):
+        elapsed = await measure(session_maker, read_function)
+        print(f"{read_function.__name__:<20} {elapsed * 1000:8.1f} ms  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
@@ -14,6 +14,11 @@ from db import create_db_and_tables
 import uvicorn
 from fastapi.responses import JSONResponse
 from processing.processing import processing_router
+from services.archive import ArchiveService
+from services.importJob import ImportJobService
+from services.item import ItemService
+from services.maintenance import MaintenanceService
+from services.outbox import OutboxService
 from services.notification import NotificationService
 
 # Redis Connection - EINFACHSTE METHODE
@@ -105,6 +110,10 @@ async def on_startup():
     # Create database
     await create_db_and_tables()
     logging.info("✅ Database initialized")
+    await ImportJobService.resume(bot)
+    ArchiveService.start()
+    MaintenanceService.start()
+    OutboxService.start(bot)
     
     # Set webhook
     webhook_info = await bot.get_webhook_info()
@@ -155,6 +164,7 @@ async def on_startup():
 @app.on_event("shutdown")
 async def on_shutdown():
     logging.warning('🛑 Shutting down...')
+    ItemService.shutdown_parsing_pool()
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.storage.close()
     if redis:
@@ -45,12 +45,26 @@ SUPPORT_LINK = os.environ.get("SUPPORT_LINK")
 DB_ENCRYPTION = os.environ.get("DB_ENCRYPTION", "false").lower() == 'true'
 DB_NAME = os.environ.get("DB_NAME", "database.db")
 DB_PASS = os.environ.get("DB_PASS", "")
+# Hours between two online backups to data/backups (0 = no scheduled backups)
+BACKUP_INTERVAL_HOURS = int(os.environ.get("BACKUP_INTERVAL_HOURS", "24"))
+# Number of compressed backups kept, older ones are deleted (at least 1, the newest backup is never deleted)
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", "7"))
 
 # Bot Settings
 PAGE_ENTRIES = int(os.environ.get("PAGE_ENTRIES", "8"))
 BOT_LANGUAGE = os.environ.get("BOT_LANGUAGE", "en")
 MULTIBOT = os.environ.get("MULTIBOT", "false").lower() == 'true'
 CURRENCY = Currency(os.environ.get("CURRENCY", "USD"))
+# Seconds a callback handler gets to set an alert before the callback query is answered (0 = answer immediately)
+CALLBACK_ANSWER_BUDGET = float(os.environ.get("CALLBACK_ANSWER_BUDGET", "0.3"))
+# Items inserted per transaction when importing inventory files
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "2000"))
+# Worker processes that parse inventory files off the event loop
+IMPORT_PARSER_PROCESSES = int(os.environ.get("IMPORT_PARSER_PROCESSES", "1"))
+# Seconds crypto prices fetched from CoinGecko are reused before they are fetched again
+CRYPTO_PRICES_CACHE_TTL = int(os.environ.get("CRYPTO_PRICES_CACHE_TTL", "60"))
+# Days after which sold items are moved to the archive tables (0 = never)
+ARCHIVE_SOLD_ITEMS_AFTER_DAYS = int(os.environ.get("ARCHIVE_SOLD_ITEMS_AFTER_DAYS", "30"))
 
 # Payment Configuration
 KRYPTO_EXPRESS_API_KEY = os.environ.get("KRYPTO_EXPRESS_API_KEY", "")
@@ -1,3 +1,5 @@
+import time
+
 import aiohttp
 import config
 from enums.cryptocurrency import Cryptocurrency
@@ -11,6 +13,9 @@ class CryptoApiWrapper:
     SOL_API_BASENAME_TX = "https://solscan.io/tx/"
     ETH_API_BASENAME_TX = "https://etherscan.io/tx/"
     BNB_API_BASENAME_TX = "https://bscscan.com/tx/"
+    # last CoinGecko response and its time.monotonic(), shared by every caller in this process
+    __prices: dict | None = None
+    __prices_fetched_at = 0.0
 
     @staticmethod
     async def fetch_api_request(url: str, params: dict | None = None, method: str = "GET", data: str | None = None,
@@ -23,12 +28,26 @@ class CryptoApiWrapper:
 
     @staticmethod
     async def get_crypto_prices() -> dict:
+        if (CryptoApiWrapper.__prices is not None
+                and time.monotonic() - CryptoApiWrapper.__prices_fetched_at < config.CRYPTO_PRICES_CACHE_TTL):
+            return CryptoApiWrapper.__prices
         url = f"https://api.coingecko.com/api/v3/simple/price"
         params = {
-            "ids": "bitcoin,litecoin,solana,ethereum,binancecoin",
+            "ids": ",".join(cryptocurrency.get_coingecko_name() for cryptocurrency in Cryptocurrency),
             "vs_currencies": "usd,eur,gbp,jpy,cad"
         }
-        return await CryptoApiWrapper.fetch_api_request(url, params)
+        prices = await CryptoApiWrapper.fetch_api_request(url, params)
+        # a failed request (e.g. rate limited) keeps serving the previous prices
+        if prices is not None:
+            CryptoApiWrapper.__prices = prices
+            CryptoApiWrapper.__prices_fetched_at = time.monotonic()
+        return CryptoApiWrapper.__prices
+
+    @staticmethod
+    async def get_fiat_prices() -> dict[Cryptocurrency, float]:
+        prices = await CryptoApiWrapper.get_crypto_prices()
+        return {cryptocurrency: prices[cryptocurrency.get_coingecko_name()][config.CURRENCY.value.lower()]
+                for cryptocurrency in Cryptocurrency}
 
     @staticmethod
     async def get_wallet_balance() -> dict:
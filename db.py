@@ -2,13 +2,13 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
-from sqlalchemy import event, Engine, text, create_engine, Result, CursorResult
+from sqlalchemy import event, Engine, create_engine, Result, CursorResult
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 
 import config
 from config import DB_NAME
-from models.base import Base
+from migrations import migrate
 
 if config.DB_ENCRYPTION:
     # Installing sqlcipher3 on windows has some difficulties,
@@ -27,6 +27,15 @@ from models.buyItem import BuyItem
 from models.category import Category
 from models.subcategory import Subcategory
 from models.deposit import Deposit
+from models.importJob import ImportJob
+from models.importJobFile import ImportJobFile
+from models.salesRollup import SalesRollup
+from models.depositRollup import DepositRollup
+from models.archivedItem import ArchivedItem
+from models.payment import Payment
+from models.balanceEntry import BalanceEntry
+from models.outboxMessage import OutboxMessage
+from models.schemaVersion import SchemaVersion
 
 url = ""
 engine = None
@@ -64,15 +73,28 @@ async def get_db_session() -> AsyncSession | Session:
             session.close()
 
 
-async def session_execute(stmt, session: AsyncSession | Session) -> Result[Any] | CursorResult[Any]:
+async def session_execute(stmt, session: AsyncSession | Session,
+                          params: list[dict] | dict | None = None) -> Result[Any] | CursorResult[Any]:
     if isinstance(session, AsyncSession):
-        query_result = await session.execute(stmt)
+        query_result = await session.execute(stmt, params)
         return query_result
     else:
-        query_result = session.execute(stmt)
+        query_result = session.execute(stmt, params)
         return query_result
 
 
+async def session_stream(stmt, session: AsyncSession | Session, partition_size: int):
+    # rows are fetched from the cursor one partition at a time instead of loading the whole result
+    if isinstance(session, AsyncSession):
+        query_result = await session.stream(stmt.execution_options(yield_per=partition_size))
+        async for partition in query_result.partitions():
+            yield partition
+    else:
+        query_result = session.execute(stmt.execution_options(yield_per=partition_size))
+        for partition in query_result.partitions():
+            yield partition
+
+
 async def session_flush(session: AsyncSession | Session) -> None:
     if isinstance(session, AsyncSession):
         await session.flush()
@@ -87,38 +109,26 @@ async def session_commit(session: AsyncSession | Session) -> None:
         session.commit()
 
 
+async def session_rollback(session: AsyncSession | Session) -> None:
+    if isinstance(session, AsyncSession):
+        await session.rollback()
+    else:
+        session.rollback()
+
+
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
-    if config.DB_ENCRYPTION:
-        cursor.execute("PRAGMA journal_mode=WAL")
+    # readers (backups, exports) don't block writers and the other way round
+    cursor.execute("PRAGMA journal_mode=WAL")
     cursor.close()
 
 
-async def check_all_tables_exist(session: AsyncSession | Session):
-    for table in Base.metadata.tables.values():
-        sql_query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table.name}';"
-        if isinstance(session, AsyncSession):
-            result = await session.execute(text(sql_query))
-            if result.scalar() is None:
-                return False
-        else:
-            result = session.execute(text(sql_query))
-            if result.scalar() is None:
-                return False
-    return True
-
-
 async def create_db_and_tables():
-    async with get_db_session() as session:
-        if await check_all_tables_exist(session):
-            pass
-        else:
-            if isinstance(session, AsyncSession):
-                async with engine.begin() as conn:
-                    await conn.run_sync(Base.metadata.drop_all)
-                    await conn.run_sync(Base.metadata.create_all)
-            else:
-                Base.metadata.drop_all(bind=engine)
-                Base.metadata.create_all(bind=engine)
+    if config.DB_ENCRYPTION:
+        with engine.begin() as conn:
+            migrate(conn)
+    else:
+        async with engine.begin() as conn:
+            await conn.run_sync(migrate)
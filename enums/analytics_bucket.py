@@ -0,0 +1,45 @@
+import datetime
+from enum import Enum
+
+from enums.rollup_period import RollupPeriod
+
+
+class AnalyticsBucket(Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+
+    def get_timedelta(self) -> datetime.timedelta:
+        match self:
+            case AnalyticsBucket.HOUR:
+                return datetime.timedelta(hours=1)
+            case AnalyticsBucket.DAY:
+                return datetime.timedelta(days=1)
+            case AnalyticsBucket.WEEK:
+                return datetime.timedelta(weeks=1)
+
+    def get_rollup_period(self) -> RollupPeriod:
+        # weeks are summed from daily rollups
+        match self:
+            case AnalyticsBucket.HOUR:
+                return RollupPeriod.HOUR
+            case AnalyticsBucket.DAY | AnalyticsBucket.WEEK:
+                return RollupPeriod.DAY
+
+    def get_start(self, time: datetime.datetime) -> datetime.datetime:
+        # weeks start on monday
+        match self:
+            case AnalyticsBucket.HOUR:
+                return time.replace(minute=0, second=0, microsecond=0)
+            case AnalyticsBucket.DAY:
+                return time.replace(hour=0, minute=0, second=0, microsecond=0)
+            case AnalyticsBucket.WEEK:
+                return (time - datetime.timedelta(days=time.weekday())).replace(hour=0, minute=0, second=0,
+                                                                                microsecond=0)
+
+    def get_end(self, time: datetime.datetime) -> datetime.datetime:
+        # exclusive end of the bucket, a time already on a boundary is its own end
+        start = self.get_start(time)
+        if start == time:
+            return time
+        return start + self.get_timedelta()
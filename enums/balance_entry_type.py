@@ -0,0 +1,20 @@
+from enum import Enum
+
+
+class BalanceEntryType(Enum):
+    DEPOSIT = "DEPOSIT"
+    PURCHASE = "PURCHASE"
+    REFUND = "REFUND"
+    ADMIN_TOP_UP = "ADMIN_TOP_UP"
+    ADMIN_DEDUCTION = "ADMIN_DEDUCTION"
+    # balances of users registered before the ledger existed
+    OPENING_TOP_UP = "OPENING_TOP_UP"
+    OPENING_CONSUMED = "OPENING_CONSUMED"
+
+    def is_top_up(self) -> bool:
+        # top ups are cached in User.top_up_amount, everything else in User.consume_records
+        match self:
+            case BalanceEntryType.DEPOSIT | BalanceEntryType.ADMIN_TOP_UP | BalanceEntryType.OPENING_TOP_UP:
+                return True
+            case _:
+                return False
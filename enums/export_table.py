@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class ExportTable(Enum):
+    BUYS = "buys"
+    BUY_ITEMS = "buy_items"
+    DEPOSITS = "deposits"
+    PAYMENTS = "payments"
+    USERS = "users"
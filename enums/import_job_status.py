@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ImportJobStatus(Enum):
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class OutboxMethod(Enum):
+    SEND_MESSAGE = "SEND_MESSAGE"
+    EDIT_MESSAGE = "EDIT_MESSAGE"
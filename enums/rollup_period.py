@@ -0,0 +1,14 @@
+from enum import Enum
+
+
+class RollupPeriod(Enum):
+    HOUR = "HOUR"
+    DAY = "DAY"
+
+    def get_strftime_format(self) -> str:
+        # start of the period in the format SQLAlchemy stores DateTime in on SQLite, so both compare as strings
+        match self:
+            case RollupPeriod.HOUR:
+                return "%Y-%m-%d %H:00:00.000000"
+            case RollupPeriod.DAY:
+                return "%Y-%m-%d 00:00:00.000000"
@@ -4,6 +4,7 @@ Erstelle dieses File: handlers/admin/shop_management.py
 """
 from aiogram import types, F, Router
 from aiogram.types import CallbackQuery, Message
+from aiogram.utils.callback_answer import CallbackAnswer
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -69,7 +70,6 @@ async def show_shop_management_menu(callback: CallbackQuery, state: FSMContext):
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
     except:
         await callback.message.answer(text, reply_markup=builder.as_markup())
-    await callback.answer()
 
 
 # ===== CATEGORIES =====
@@ -125,7 +125,6 @@ async def view_categories(callback: CallbackQuery, callback_data: AdminShopCallb
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
     except:
         await callback.message.answer(text, reply_markup=builder.as_markup())
-    await callback.answer()
 
 
 @admin_shop_router.callback_query(
@@ -151,7 +150,6 @@ async def start_add_category(callback: CallbackQuery, state: FSMContext):
         pass
     
     await callback.message.answer(text, reply_markup=builder.as_markup())
-    await callback.answer()
 
 
 @admin_shop_router.message(AdminShopStates.waiting_for_category_name, IsAdminFilter())
@@ -254,7 +252,7 @@ async def process_category_description(message: Message, state: FSMContext, sess
     IsAdminFilter()
 )
 async def view_subcategories(callback: CallbackQuery, callback_data: AdminShopCallback,
-                            state: FSMContext, session: AsyncSession | Session):
+                            state: FSMContext, session: AsyncSession | Session, callback_answer: CallbackAnswer):
     """Liste aller Subkategorien einer Kategorie"""
     await state.clear()
     
@@ -262,7 +260,8 @@ async def view_subcategories(callback: CallbackQuery, callback_data: AdminShopCa
     category = await ShopService.get_category_by_id(category_id, session)
     
     if not category:
-        await callback.answer("❌ Kategorie nicht gefunden!", show_alert=True)
+        callback_answer.text = "❌ Kategorie nicht gefunden!"
+        callback_answer.show_alert = True
         return
     
     subcategories = await ShopService.get_subcategories_by_category(category_id, session, active_only=False)
@@ -320,7 +319,6 @@ async def view_subcategories(callback: CallbackQuery, callback_data: AdminShopCa
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
     except:
         await callback.message.answer(text, reply_markup=builder.as_markup())
-    await callback.answer()
 
 
 @admin_shop_router.callback_query(
@@ -345,7 +343,6 @@ async def start_add_subcategory(callback: CallbackQuery, callback_data: AdminSho
         pass
     
     await callback.message.answer(text)
-    await callback.answer()
 
 
 @admin_shop_router.message(AdminShopStates.waiting_for_subcategory_name, IsAdminFilter())
@@ -450,7 +447,7 @@ async def process_subcategory_description(message: Message, state: FSMContext, s
     IsAdminFilter()
 )
 async def view_products(callback: CallbackQuery, callback_data: AdminShopCallback,
-                       state: FSMContext, session: AsyncSession | Session):
+                       state: FSMContext, session: AsyncSession | Session, callback_answer: CallbackAnswer):
     """Liste aller Produkte einer Subkategorie"""
     await state.clear()
     
@@ -459,7 +456,8 @@ async def view_products(callback: CallbackQuery, callback_data: AdminShopCallbac
     
     subcategory = await ShopService.get_subcategory_by_id(subcategory_id, session)
     if not subcategory:
-        await callback.answer("❌ Subkategorie nicht gefunden!", show_alert=True)
+        callback_answer.text = "❌ Subkategorie nicht gefunden!"
+        callback_answer.show_alert = True
         return
     
     products = await ShopService.get_products_by_subcategory(subcategory_id, session, active_only=False)
@@ -525,7 +523,6 @@ async def view_products(callback: CallbackQuery, callback_data: AdminShopCallbac
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
     except:
         await callback.message.answer(text, reply_markup=builder.as_markup())
-    await callback.answer()
 
 
 # ===== PRODUCT ADD (Multi-Step) =====
@@ -554,7 +551,6 @@ async def start_add_product(callback: CallbackQuery, callback_data: AdminShopCal
         pass
     
     await callback.message.answer(text)
-    await callback.answer()
 
 
 @admin_shop_router.message(AdminShopStates.waiting_for_product_name, IsAdminFilter())
@@ -720,7 +716,7 @@ async def process_product_description(message: Message, state: FSMContext, sessi
     IsAdminFilter()
 )
 async def confirm_delete_category(callback: CallbackQuery, callback_data: AdminShopCallback,
-                                 session: AsyncSession | Session):
+                                 state: FSMContext, session: AsyncSession | Session, callback_answer: CallbackAnswer):
     """Confirm category deletion"""
     if not callback_data.confirmation:
         category = await ShopService.get_category_by_id(callback_data.category_id, session)
@@ -752,18 +748,18 @@ async def confirm_delete_category(callback: CallbackQuery, callback_data: AdminS
         builder.adjust(1)
         
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
-        await callback.answer()
     else:
-        # Delete confirmed
+        # Delete confirmed, a delete slower than the answer budget gets its result as a message instead of an alert
         success = await ShopService.delete_category(callback_data.category_id, session)
         
+        callback_answer.show_alert = True
         if success:
-            await callback.answer("✅ Kategorie gelöscht!", show_alert=True)
+            callback_answer.text = "✅ Kategorie gelöscht!"
         else:
-            await callback.answer("❌ Fehler beim Löschen!", show_alert=True)
+            callback_answer.text = "❌ Fehler beim Löschen!"
         
         # Redirect to categories list
-        await view_categories(callback, callback_data, None, session)
+        await view_categories(callback, callback_data, state, session)
 
 
 @admin_shop_router.callback_query(
@@ -771,7 +767,7 @@ async def confirm_delete_category(callback: CallbackQuery, callback_data: AdminS
     IsAdminFilter()
 )
 async def confirm_delete_subcategory(callback: CallbackQuery, callback_data: AdminShopCallback,
-                                    session: AsyncSession | Session):
+                                    state: FSMContext, session: AsyncSession | Session, callback_answer: CallbackAnswer):
     """Confirm subcategory deletion"""
     if not callback_data.confirmation:
         subcategory = await ShopService.get_subcategory_by_id(callback_data.subcategory_id, session)
@@ -805,18 +801,18 @@ async def confirm_delete_subcategory(callback: CallbackQuery, callback_data: Adm
         builder.adjust(1)
         
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
-        await callback.answer()
     else:
-        # Delete confirmed
+        # Delete confirmed, a delete slower than the answer budget gets its result as a message instead of an alert
         success = await ShopService.delete_subcategory(callback_data.subcategory_id, session)
         
+        callback_answer.show_alert = True
         if success:
-            await callback.answer("✅ Subkategorie gelöscht!", show_alert=True)
+            callback_answer.text = "✅ Subkategorie gelöscht!"
         else:
-            await callback.answer("❌ Fehler beim Löschen!", show_alert=True)
+            callback_answer.text = "❌ Fehler beim Löschen!"
         
         # Redirect to subcategories list
-        await view_subcategories(callback, callback_data, None, session)
+        await view_subcategories(callback, callback_data, state, session, callback_answer)
 
 
 # ===== SETTINGS =====
@@ -850,4 +846,3 @@ async def show_settings(callback: CallbackQuery, session: AsyncSession | Session
         await callback.message.edit_text(text, reply_markup=builder.as_markup())
     except:
         await callback.message.answer(text, reply_markup=builder.as_markup())
-    await callback.answer()
@@ -42,21 +42,29 @@ async def receive_admin_message(message: Message, state: FSMContext):
 
 async def send_generated_msg(**kwargs):
     callback = kwargs.get("callback")
+    state = kwargs.get("state")
     session = kwargs.get("session")
     unpacked_cb = AdminAnnouncementCallback.unpack(callback.data)
     kb_builder = AdminAnnouncementsConstants.get_confirmation_builder(unpacked_cb.announcement_type)
     if unpacked_cb.announcement_type == AnnouncementType.RESTOCKING:
-        msg = await NewItemsManager.generate_restocking_message(session)
-        await callback.message.answer(msg, reply_markup=kb_builder.as_markup())
+        msgs = await NewItemsManager.generate_restocking_message(session)
     else:
-        msg = await NewItemsManager.generate_in_stock_message(session)
-        await callback.message.answer(msg, reply_markup=kb_builder.as_markup())
+        msgs = await NewItemsManager.generate_in_stock_message(session)
+    message_ids = []
+    for msg in msgs[:-1]:
+        message = await callback.message.answer(msg)
+        message_ids.append(message.message_id)
+    message = await callback.message.answer(msgs[-1], reply_markup=kb_builder.as_markup())
+    message_ids.append(message.message_id)
+    # the confirmation button sits on the last part, the broadcast copies all parts
+    await state.update_data(announcement_message_ids=message_ids)
 
 
 async def send_confirmation(**kwargs):
     callback = kwargs.get("callback")
     session = kwargs.get("session")
-    msg = await AdminService.send_announcement(callback, session)
+    state = kwargs.get("state")
+    msg = await AdminService.send_announcement(callback, state, session)
     if callback.message.caption:
         await callback.message.delete()
         await callback.message.answer(text=msg)
@@ -39,3 +39,8 @@ class UserManagementStates(StatesGroup):
 
 class WalletStates(StatesGroup):
     crypto_address = State()
+
+
+class StatisticsStates(StatesGroup):
+    analytics_range = State()
+    export_request = State()
@@ -9,7 +9,7 @@ from callbacks import AdminInventoryManagementCallback, AddType
 from enums.bot_entity import BotEntity
 from handlers.admin.constants import AdminInventoryManagementStates
 from services.admin import AdminService
-from services.item import ItemService
+from services.importJob import ImportJobService
 from utils.custom_filters import AdminIdFilter
 from utils.localizator import Localizator
 
@@ -55,20 +55,22 @@ async def confirm_delete(**kwargs):
         await callback.message.edit_text(text=msg, reply_markup=kb_builder.as_markup())
 
 
-@inventory_management.message(AdminIdFilter(), F.document, StateFilter(AdminInventoryManagementStates.document))
-async def add_items_document(message: Message, state: FSMContext, session: AsyncSession | Session):
-    if message.text and message.text.lower() == 'cancel':
+@inventory_management.message(AdminIdFilter(), F.text, StateFilter(AdminInventoryManagementStates.document))
+async def add_items_cancel(message: Message, state: FSMContext):
+    if message.text.lower() == 'cancel':
         await state.clear()
         await message.answer(Localizator.get_text(BotEntity.COMMON, "cancelled"))
+
+
+@inventory_management.message(AdminIdFilter(), F.document, StateFilter(AdminInventoryManagementStates.document))
+async def add_items_document(message: Message, state: FSMContext, session: AsyncSession | Session):
     state_data = await state.get_data()
     add_type = AddType(int(state_data['add_type']))
-    file_name = message.document.file_name
-    file_id = message.document.file_id
-    file = await message.bot.get_file(file_id)
-    await message.bot.download_file(file.file_path, file_name)
-    msg = await ItemService.add_items(file_name, add_type, session)
-    await message.answer(text=msg)
-    await state.clear()
+    # the state is kept until the admin presses done, so further documents are appended to the same import job
+    import_job_id = await ImportJobService.add_file(state_data.get('import_job_id'), message, add_type, session)
+    await state.update_data(import_job_id=import_job_id)
+    msg, kb_builder = AdminService.get_add_items_file_queued()
+    await message.answer(text=msg, reply_markup=kb_builder.as_markup())
 
 
 @inventory_management.callback_query(AdminIdFilter(), AdminInventoryManagementCallback.filter())
@@ -1,14 +1,18 @@
 import inspect
+import tempfile
+from pathlib import Path
 
-from aiogram import Router, types
+from aiogram import Router, types, F
+from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-import config
 from callbacks import StatisticsCallback
+from handlers.admin.constants import StatisticsStates
 from services.admin import AdminService
+from services.maintenance import MaintenanceService
 from utils.custom_filters import AdminIdFilter
 
 statistics = Router()
@@ -37,10 +41,39 @@ async def entity_statistics(**kwargs):
 
 async def get_db_file(**kwargs):
     callback = kwargs.get("callback")
-    await callback.answer()
-    with open(f"./data/{config.DB_NAME}", "rb") as f:
+    # an online backup, copying the live file could catch it in the middle of a write.
+    # It is written to its own temporary folder next to the database, so it never collides with
+    # a scheduled backup and doesn't count towards BACKUP_KEEP
+    with tempfile.TemporaryDirectory(dir=MaintenanceService.database_path.parent) as backup_folder:
+        backup_path = await MaintenanceService.create_backup(Path(backup_folder))
         await callback.message.bot.send_document(callback.from_user.id,
-                                                 types.BufferedInputFile(file=f.read(), filename="database.db"))
+                                                 types.FSInputFile(backup_path, filename="database.db.gz"))
+
+
+async def analytics_range_request(**kwargs):
+    callback = kwargs.get("callback")
+    state = kwargs.get("state")
+    msg, kb_builder = await AdminService.request_analytics_range(state)
+    await callback.message.edit_text(text=msg, reply_markup=kb_builder.as_markup())
+
+
+@statistics.message(AdminIdFilter(), F.text, StateFilter(StatisticsStates.analytics_range))
+async def analytics_range(message: Message, state: FSMContext, session: AsyncSession | Session):
+    msg, kb_builder = await AdminService.get_analytics(message, state, session)
+    await message.answer(text=msg, reply_markup=kb_builder.as_markup())
+
+
+async def export_request(**kwargs):
+    callback = kwargs.get("callback")
+    state = kwargs.get("state")
+    msg, kb_builder = await AdminService.request_export(state)
+    await callback.message.edit_text(text=msg, reply_markup=kb_builder.as_markup())
+
+
+@statistics.message(AdminIdFilter(), F.text, StateFilter(StatisticsStates.export_request))
+async def export_data(message: Message, state: FSMContext, session: AsyncSession | Session):
+    msg, kb_builder = await AdminService.send_export(message, state, session)
+    await message.answer(text=msg, reply_markup=kb_builder.as_markup())
 
 
 @statistics.callback_query(AdminIdFilter(), StatisticsCallback.filter())
@@ -52,7 +85,9 @@ async def statistics_navigation(callback: CallbackQuery, state: FSMContext, call
         0: statistics_menu,
         1: timedelta_picker,
         2: entity_statistics,
-        3: get_db_file
+        3: get_db_file,
+        4: analytics_range_request,
+        5: export_request
     }
     current_level_function = levels[current_level]
 
@@ -2,6 +2,7 @@ from aiogram import types
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from enums.bot_entity import BotEntity
+from utils.keyset_pagination import KeysetPage
 from utils.localizator import Localizator
 
 
@@ -34,3 +35,29 @@ async def add_pagination_buttons(keyboard_builder: InlineKeyboardBuilder, unpack
     if back_button:
         keyboard_builder.row(back_button)
     return keyboard_builder
+
+
+async def add_keyset_pagination_buttons(keyboard_builder: InlineKeyboardBuilder, unpacked_cb, keyset_page: KeysetPage,
+                                        back_button) -> InlineKeyboardBuilder:
+    buttons = []
+    if keyset_page.previous_key is not None:
+        first_page_callback = unpacked_cb.__copy__()
+        first_page_callback.page = 0
+        previous_page_callback = unpacked_cb.__copy__()
+        previous_page_callback.page = keyset_page.previous_key
+        buttons.append(
+            types.InlineKeyboardButton(text=Localizator.get_text(BotEntity.COMMON, "pagination_first"),
+                                       callback_data=first_page_callback.pack()))
+        buttons.append(
+            types.InlineKeyboardButton(text=Localizator.get_text(BotEntity.COMMON, "pagination_previous"),
+                                       callback_data=previous_page_callback.pack()))
+    if keyset_page.next_key is not None:
+        next_page_callback = unpacked_cb.__copy__()
+        next_page_callback.page = keyset_page.next_key
+        buttons.append(
+            types.InlineKeyboardButton(text=Localizator.get_text(BotEntity.COMMON, "pagination_next"),
+                                       callback_data=next_page_callback.pack()))
+    keyboard_builder.row(*buttons)
+    if back_button:
+        keyboard_builder.row(back_button)
+    return keyboard_builder
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+from aiogram.utils.callback_answer import CallbackAnswer
+
+
+class BudgetCallbackAnswer(CallbackAnswer):
+    """
+    Unlike aiogram's CallbackAnswer, text, show_alert and disabled can still be set after the query was answered.
+    A text set too late is kept in late_text and sent to the chat as a message once the handler is done.
+    """
+
+    def __init__(self, answered: bool):
+        super().__init__(answered=answered)
+        self.late_text: str | None = None
+
+    def mark_answered(self):
+        self._answered = True
+
+    @property
+    def disabled(self) -> bool:
+        return self._disabled
+
+    @disabled.setter
+    def disabled(self, value: bool):
+        # the answer is already sent, there is nothing left to disable
+        if not self._answered:
+            self._disabled = value
+
+    @property
+    def text(self) -> str | None:
+        return self._text
+
+    @text.setter
+    def text(self, value: str | None):
+        if self._answered:
+            self.late_text = value
+        else:
+            self._text = value
+
+    @property
+    def show_alert(self) -> bool | None:
+        return self._show_alert
+
+    @show_alert.setter
+    def show_alert(self, value: bool | None):
+        if not self._answered:
+            self._show_alert = value
+
+
+class CallbackAnswerMiddleware(BaseMiddleware):
+    """
+    Answers callback queries without waiting for the handler to finish.
+    With budget=0 the query is answered before the handler runs, otherwise the handler gets
+    `budget` seconds to fill `callback_answer` (text, show_alert) before the answer is sent,
+    while the handler itself keeps running. A text set after the answer is sent as a message.
+    """
+
+    def __init__(self, budget: float = 0.0):
+        self.budget = budget
+
+    async def __call__(
+            self,
+            handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        callback_answer = BudgetCallbackAnswer(answered=False)
+        data["callback_answer"] = callback_answer
+        timer = None
+        if self.budget <= 0:
+            await self.answer(event, callback_answer)
+        else:
+            timer = asyncio.create_task(self.answer_later(event, callback_answer))
+        try:
+            return await handler(event, data)
+        finally:
+            if timer is not None:
+                if callback_answer.answered:
+                    await timer
+                else:
+                    timer.cancel()
+                    await self.answer(event, callback_answer)
+            if callback_answer.late_text is not None:
+                await self.send_late_text(event, callback_answer.late_text)
+
+    async def answer_later(self, event: CallbackQuery, callback_answer: BudgetCallbackAnswer):
+        await asyncio.sleep(self.budget)
+        await self.answer(event, callback_answer)
+
+    @staticmethod
+    async def answer(event: CallbackQuery, callback_answer: BudgetCallbackAnswer):
+        if callback_answer.answered or callback_answer.disabled:
+            return
+        callback_answer.mark_answered()
+        try:
+            await event.answer(text=callback_answer.text,
+                               show_alert=callback_answer.show_alert,
+                               url=callback_answer.url,
+                               cache_time=callback_answer.cache_time)
+        except Exception as e:
+            logging.error(f"Callback answer failed: {e}")
+
+    @staticmethod
+    async def send_late_text(event: CallbackQuery, text: str):
+        try:
+            await event.bot.send_message(event.from_user.id, text)
+        except Exception as e:
+            logging.error(f"Late callback answer failed: {e}")
@@ -0,0 +1,190 @@
+import logging
+from typing import Callable
+
+from sqlalchemy import Connection, Column, Index, Table, text, inspect, select, update, bindparam, insert, func, \
+    literal, delete
+
+from enums.balance_entry_type import BalanceEntryType
+from enums.rollup_period import RollupPeriod
+from models.balanceEntry import BalanceEntry
+from models.base import Base
+from models.buy import Buy
+from models.buyItem import BuyItem
+from models.cartItem import CartItem
+from models.deposit import Deposit
+from models.depositRollup import DepositRollup
+from models.item import Item, private_data_hash
+from models.outboxMessage import OutboxMessage
+from models.payment import Payment
+from models.salesRollup import SalesRollup
+from models.user import User
+from models.schemaVersion import SchemaVersion
+
+"""
+Forward migrations for databases created by an older version of the bot, applied in order on startup.
+Every migration must be idempotent, a migration interrupted by a restart runs again from the start.
+New databases are created from the models and stamped with the latest version without running them.
+To change the schema of a live database append a migration, never edit an applied one.
+"""
+
+
+def create_table(connection: Connection, table: Table):
+    table.create(connection, checkfirst=True)
+
+
+def add_column(connection: Connection, column: Column):
+    # SQLite can only add nullable columns without a constraint to an existing table
+    existing_columns = {existing_column["name"] for existing_column in inspect(connection).get_columns(column.table.name)}
+    if column.name not in existing_columns:
+        column_type = column.type.compile(connection.dialect)
+        connection.execute(text(f"ALTER TABLE {column.table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def create_index(connection: Connection, index: Index):
+    index.create(connection, checkfirst=True)
+
+
+def get_index(table: Table, name: str) -> Index:
+    return next(index for index in table.indexes if index.name == name)
+
+
+def create_new_tables(connection: Connection):
+    # tables added after the first release, payments were only created when models.payment happened to be imported
+    for table_name in ["payments", "import_jobs", "import_job_files", "sales_rollups", "deposit_rollups",
+                       "archived_items"]:
+        create_table(connection, Base.metadata.tables[table_name])
+
+
+def add_private_data_hashes(connection: Connection):
+    add_column(connection, Item.__table__.c.private_data_hash)
+    # unsold items imported before private_data_hash existed, later duplicates keep NULL
+    # so the unique index can still be built
+    taken_hashes = set(connection.execute(
+        select(Item.private_data_hash).where(Item.private_data_hash != None, Item.is_sold == False)).scalars())
+    items = connection.execute(select(Item.id, Item.private_data)
+                               .where(Item.private_data_hash == None, Item.is_sold == False)
+                               .order_by(Item.id))
+    hashes = []
+    for item_id, private_data in items:
+        item_hash = private_data_hash(private_data)
+        if item_hash not in taken_hashes:
+            taken_hashes.add(item_hash)
+            hashes.append({"item_id": item_id, "item_hash": item_hash})
+    if len(hashes) > 0:
+        connection.execute(update(Item)
+                           .where(Item.id == bindparam("item_id"))
+                           .values(private_data_hash=bindparam("item_hash")), hashes)
+    create_index(connection, get_index(Item.__table__, "ix_items_private_data_hash_unsold"))
+
+
+def merge_cart_lines(connection: Connection):
+    # before cart lines were upserted the same subcategory could end up in several lines of one cart,
+    # they are merged into the first line so the unique index can be built
+    cart_item_key = (CartItem.cart_id, CartItem.category_id, CartItem.subcategory_id)
+    duplicates = connection.execute(select(func.min(CartItem.id), func.sum(CartItem.quantity), *cart_item_key)
+                                    .group_by(*cart_item_key)
+                                    .having(func.count(CartItem.id) > 1)).all()
+    for first_id, quantity, cart_id, category_id, subcategory_id in duplicates:
+        connection.execute(update(CartItem).where(CartItem.id == first_id).values(quantity=quantity))
+        connection.execute(delete(CartItem).where(CartItem.cart_id == cart_id,
+                                                  CartItem.category_id == category_id,
+                                                  CartItem.subcategory_id == subcategory_id,
+                                                  CartItem.id != first_id))
+    create_index(connection, get_index(CartItem.__table__, "ix_cart_items_cart_category_subcategory"))
+
+
+def add_buy_subcategories(connection: Connection):
+    add_column(connection, Buy.__table__.c.subcategory_id)
+    # buys made before Buy.subcategory_id existed take it from one of their items
+    subcategory_id = (select(Item.subcategory_id)
+                      .join(BuyItem, BuyItem.item_id == Item.id)
+                      .where(BuyItem.buy_id == Buy.id)
+                      .limit(1)
+                      .scalar_subquery())
+    connection.execute(update(Buy).where(Buy.subcategory_id == None).values(subcategory_id=subcategory_id))
+
+
+def fill_statistics_rollups(connection: Connection):
+    # rollup tables created on an existing database are filled once from all buys and deposits
+    if connection.execute(select(SalesRollup.period).limit(1)).first() is None:
+        for period in RollupPeriod:
+            period_start = func.strftime(period.get_strftime_format(), Buy.buy_datetime)
+            connection.execute(insert(SalesRollup).from_select(
+                [SalesRollup.period, SalesRollup.period_start, SalesRollup.revenue, SalesRollup.items_sold,
+                 SalesRollup.buys_count],
+                select(literal(period, SalesRollup.period.type), period_start, func.sum(Buy.total_price),
+                       func.sum(Buy.quantity), func.count(Buy.id))
+                .where(Buy.is_refunded == False)
+                .group_by(period_start)))
+    if connection.execute(select(DepositRollup.period).limit(1)).first() is None:
+        for period in RollupPeriod:
+            period_start = func.strftime(period.get_strftime_format(), Deposit.deposit_datetime)
+            connection.execute(insert(DepositRollup).from_select(
+                [DepositRollup.period, DepositRollup.period_start, DepositRollup.network, DepositRollup.amount,
+                 DepositRollup.deposits_count],
+                select(literal(period, DepositRollup.period.type), period_start, Deposit.network,
+                       func.total(Deposit.amount), func.count(Deposit.id))
+                .group_by(period_start, Deposit.network)))
+
+
+def create_lookup_indexes(connection: Connection):
+    for table_name, index_name in [("items", "ix_items_category_subcategory_is_sold"),
+                                   ("buys", "ix_buys_buyer_id"),
+                                   ("users", "ix_users_registered_at"),
+                                   ("import_job_files", "ix_import_job_files_job_id"),
+                                   ("archived_items", "ix_archived_items_buy_id")]:
+        create_index(connection, get_index(Base.metadata.tables[table_name], index_name))
+
+
+def open_balance_ledger(connection: Connection):
+    create_table(connection, BalanceEntry.__table__)
+    # every balance before the ledger becomes one opening entry per column, so reconciliation starts at zero
+    if connection.execute(select(BalanceEntry.id).limit(1)).first() is None:
+        for entry_type, amount in [(BalanceEntryType.OPENING_TOP_UP, User.top_up_amount),
+                                   (BalanceEntryType.OPENING_CONSUMED, -User.consume_records)]:
+            connection.execute(insert(BalanceEntry).from_select(
+                [BalanceEntry.user_id, BalanceEntry.entry_type, BalanceEntry.amount],
+                select(User.id, literal(entry_type, BalanceEntry.entry_type.type), amount)
+                .where(amount != 0)))
+
+
+def create_payment_lookup_index(connection: Connection):
+    create_index(connection, get_index(Payment.__table__, "ix_payments_processing_payment_id"))
+
+
+def create_outbox(connection: Connection):
+    create_table(connection, OutboxMessage.__table__)
+
+
+# the version of a migration is its position in this list starting from 1
+migrations: list[Callable[[Connection], None]] = [
+    create_new_tables,
+    add_private_data_hashes,
+    merge_cart_lines,
+    add_buy_subcategories,
+    fill_statistics_rollups,
+    create_lookup_indexes,
+    open_balance_ledger,
+    create_payment_lookup_index,
+    create_outbox,
+]
+
+
+def migrate(connection: Connection):
+    # an up to date database costs one catalog lookup and one version read,
+    # databases created before migrations have tables but no schema_version yet
+    tables = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                         "AND name IN ('schema_version', 'users')")).scalars())
+    if "schema_version" in tables:
+        current_version = connection.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    elif "users" in tables:
+        create_table(connection, SchemaVersion.__table__)
+        current_version = 0
+    else:
+        Base.metadata.create_all(connection)
+        connection.execute(insert(SchemaVersion).values(version=len(migrations)))
+        return
+    for version, migration in enumerate(migrations[current_version:], start=current_version + 1):
+        logging.info(f"Applying database migration {version}: {migration.__name__}")
+        migration(connection)
+        connection.execute(insert(SchemaVersion).values(version=version))
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func
+
+from models.base import Base
+
+
+# ArchivedItem is a sold Item moved out of the items table together with its BuyItem link.
+# It gets an id of its own, items ids can be reused by SQLite once their rows are gone.
+class ArchivedItem(Base):
+    __tablename__ = 'archived_items'
+
+    id = Column(Integer, primary_key=True)
+    buy_id = Column(Integer, ForeignKey("buys.id", ondelete="CASCADE"), nullable=False, index=True)
+    category_id = Column(Integer, nullable=False)
+    subcategory_id = Column(Integer, nullable=False)
+    private_data = Column(String, nullable=False)
+    price = Column(Float, nullable=False)
+    description = Column(String, nullable=False)
+    archive_datetime = Column(DateTime, default=func.now())
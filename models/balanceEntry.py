@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Enum, func, Index
+
+from enums.balance_entry_type import BalanceEntryType
+from models.base import Base
+
+
+# BalanceEntry is an append-only ledger line, the balance columns of User are its cached sums
+class BalanceEntry(Base):
+    __tablename__ = 'balance_entries'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entry_type = Column(Enum(BalanceEntryType), nullable=False)
+    # signed, positive amounts increase the balance of the user
+    amount = Column(Float, nullable=False)
+    # id of the deposit or buy behind the entry, None for admin corrections
+    reference_id = Column(Integer, nullable=True)
+    create_datetime = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index('ix_balance_entries_user_id', 'user_id'),
+    )
+
+
+class BalanceEntryDTO(BaseModel):
+    id: int | None = None
+    user_id: int | None = None
+    entry_type: BalanceEntryType | None = None
+    amount: float | None = None
+    reference_id: int | None = None
+    create_datetime: datetime | None = None
+
+
+class BalanceMismatchDTO(BaseModel):
+    user_id: int
+    top_up_amount: float
+    consume_records: float
+    ledger_top_up_amount: float
+    ledger_consume_records: float
@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, Float, DateTime, Boolean, ForeignKey, func, CheckConstraint
+from sqlalchemy import Column, Integer, Float, DateTime, Boolean, ForeignKey, func, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 
 from models.base import Base
@@ -13,6 +13,8 @@ class Buy(Base):
     id = Column(Integer, primary_key=True, unique=True)
     buyer_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     buyer = relationship('User', backref='buys')
+    # copied from the bought items so the purchase history doesn't need to go through buyItem
+    subcategory_id = Column(Integer, ForeignKey('subcategories.id', ondelete='SET NULL'), nullable=True)
     quantity = Column(Integer, nullable=False)
     total_price = Column(Float, nullable=False)
     buy_datetime = Column(DateTime, default=func.now())
@@ -21,12 +23,15 @@ class Buy(Base):
     __table_args__ = (
         CheckConstraint('quantity > 0', name='check_quantity_positive'),
         CheckConstraint('total_price > 0', name='check_total_price_positive'),
+        # purchase history seeks by id within one buyer
+        Index('ix_buys_buyer_id', 'buyer_id'),
     )
 
 
 class BuyDTO(BaseModel):
     id: int | None = None
     buyer_id: int | None = None
+    subcategory_id: int | None = None
     quantity: int | None = None
     total_price: float | None = None
     buy_datetime: datetime | None = None
@@ -40,3 +45,10 @@ class RefundDTO(BaseModel):
     total_price: float | None = None
     quantity: int | None = None
     buy_id: int | None = None
+
+
+class PurchaseHistoryDTO(BaseModel):
+    buy_id: int | None = None
+    subcategory_name: str | None = None
+    quantity: int | None = None
+    total_price: float | None = None
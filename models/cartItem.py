@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, ForeignKey, CheckConstraint, Index
 
 from models.base import Base
 
@@ -15,6 +15,7 @@ class CartItem(Base):
 
     __table_args__ = (
         CheckConstraint('quantity > 0', name='check_quantity_positive'),
+        Index('ix_cart_items_cart_category_subcategory', 'cart_id', 'category_id', 'subcategory_id', unique=True),
     )
 
 
@@ -24,3 +25,33 @@ class CartItemDTO(BaseModel):
     category_id: int | None = None
     subcategory_id: int | None = None
     quantity: int | None = None
+
+
+class CheckoutLineDTO(BaseModel):
+    cart_item_id: int
+    category_id: int
+    subcategory_id: int
+    subcategory_name: str
+    quantity: int
+    price: float
+    available_qty: int
+
+    @property
+    def total_price(self) -> float:
+        return self.price * self.quantity
+
+    @property
+    def is_in_stock(self) -> bool:
+        return self.available_qty >= self.quantity
+
+
+class CheckoutPlanDTO(BaseModel):
+    lines: list[CheckoutLineDTO] = []
+
+    @property
+    def grand_total(self) -> float:
+        return sum(line.total_price for line in self.lines)
+
+    @property
+    def out_of_stock(self) -> list[CheckoutLineDTO]:
+        return [line for line in self.lines if line.is_in_stock is False]
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Float, Integer, Enum
+
+from enums.cryptocurrency import Cryptocurrency
+from enums.rollup_period import RollupPeriod
+from models.base import Base
+
+
+# DepositRollup holds the deposits of one network in one hour or one day, maintained on every deposit
+class DepositRollup(Base):
+    __tablename__ = 'deposit_rollups'
+
+    period = Column(Enum(RollupPeriod), primary_key=True)
+    period_start = Column(DateTime, primary_key=True)
+    network = Column(Enum(Cryptocurrency), primary_key=True)
+    # in the smallest units of the network like Deposit.amount, a float because 18 decimal networks overflow int64
+    amount = Column(Float, nullable=False, default=0.0)
+    deposits_count = Column(Integer, nullable=False, default=0)
+
+
+class DepositRollupDTO(BaseModel):
+    period: RollupPeriod | None = None
+    period_start: datetime | None = None
+    network: Cryptocurrency | None = None
+    amount: float | None = None
+    deposits_count: int | None = None
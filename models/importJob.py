@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, BigInteger, DateTime, func, Enum, String
+
+from enums.import_job_status import ImportJobStatus
+from models.base import Base
+
+
+# ImportJob is a series of inventory files sent by an admin, progress is shown by editing one status message
+class ImportJob(Base):
+    __tablename__ = 'import_jobs'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    status_message_id = Column(Integer, nullable=False)
+    add_type = Column(Integer, nullable=False)
+    status = Column(Enum(ImportJobStatus), nullable=False, default=ImportJobStatus.RUNNING)
+    added_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    create_datetime = Column(DateTime, default=func.now())
+
+
+class ImportJobDTO(BaseModel):
+    id: int | None = None
+    chat_id: int | None = None
+    status_message_id: int | None = None
+    add_type: int | None = None
+    status: ImportJobStatus | None = None
+    added_count: int | None = None
+    skipped_count: int | None = None
+    error: str | None = None
+    create_datetime: datetime | None = None
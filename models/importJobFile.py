@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, ForeignKey, String, Boolean
+
+from models.base import Base
+
+
+class ImportJobFile(Base):
+    __tablename__ = 'import_job_files'
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("import_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Telegram file_id, the file is downloaded again when an interrupted job is resumed
+    file_id = Column(String, nullable=False)
+    # checkpoint of the last committed batch, see utils.items_parser.ImportCursor
+    cursor_offset = Column(Integer, nullable=False, default=0)
+    cursor_number = Column(Integer, nullable=False, default=0)
+    is_done = Column(Boolean, nullable=False, default=False)
+
+
+class ImportJobFileDTO(BaseModel):
+    id: int | None = None
+    job_id: int | None = None
+    file_id: str | None = None
+    cursor_offset: int | None = None
+    cursor_number: int | None = None
+    is_done: bool | None = None
@@ -1,8 +1,9 @@
-from datetime import datetime
+import hashlib
+from dataclasses import dataclass
 
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, CheckConstraint
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, CheckConstraint, Index, LargeBinary, text
+from sqlalchemy.orm import relationship, backref, deferred
 
 from models.base import Base
 
@@ -14,11 +15,14 @@ class Item(Base):
     id = Column(Integer, primary_key=True, unique=True)
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
     category = relationship("Category", backref=backref("categories", cascade="all"), passive_deletes="all",
-                            lazy="joined")
+                            lazy="raise")
     subcategory_id = Column(Integer, ForeignKey("subcategories.id", ondelete="CASCADE"), nullable=False)
     subcategory = relationship("Subcategory", backref=backref("subcategories", cascade="all"), passive_deletes="all",
-                               lazy="joined")
-    private_data = Column(String, nullable=False, unique=False)
+                               lazy="raise")
+    # only loaded where goods are delivered, queries must undefer it explicitly
+    private_data = deferred(Column(String, nullable=False, unique=False), raiseload=True)
+    # sha256 of private_data, unique among unsold items so an import can't add the same good twice
+    private_data_hash = Column(LargeBinary, nullable=True)
     price = Column(Float, nullable=False)
     is_sold = Column(Boolean, nullable=False, default=False)
     is_new = Column(Boolean, nullable=False, default=True)
@@ -26,10 +30,20 @@ class Item(Base):
 
     __table_args__ = (
         CheckConstraint('price > 0', name='check_price_positive'),
+        Index('ix_items_category_subcategory_is_sold', 'category_id', 'subcategory_id', 'is_sold'),
+        Index('ix_items_private_data_hash_unsold', 'private_data_hash', unique=True, sqlite_where=text('is_sold = 0')),
     )
 
 
-class ItemDTO(BaseModel):
+def private_data_hash(private_data: str) -> bytes:
+    return hashlib.sha256(private_data.encode('utf-8')).digest()
+
+
+# items are only read from our own database, so ItemDTO is a slotted dataclass built from column rows
+# without pydantic validation, see benchmarks/dto_mapping.py. Fields are keyword-only, so a positional call
+# can't silently bind values to the wrong fields
+@dataclass(slots=True, kw_only=True)
+class ItemDTO:
     id: int | None = None
     category_id: int | None = None
     subcategory_id: int | None = None
@@ -38,3 +52,10 @@ class ItemDTO(BaseModel):
     is_sold: bool | None = None
     is_new: bool | None = None
     description: str | None = None
+
+
+class ItemStockDTO(BaseModel):
+    category_name: str
+    subcategory_name: str
+    quantity: int
+    price: float
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, func, Index
+
+from enums.outbox_method import OutboxMethod
+from models.base import Base
+
+
+# OutboxMessage is a Telegram message written in the transaction of the change it notifies about,
+# services.outbox.OutboxService sends it after the commit and deletes it once Telegram accepted it
+class OutboxMessage(Base):
+    __tablename__ = 'outbox_messages'
+
+    id = Column(Integer, primary_key=True)
+    method = Column(Enum(OutboxMethod), nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    # message to edit, only for OutboxMethod.EDIT_MESSAGE
+    message_id = Column(Integer, nullable=True)
+    text = Column(String, nullable=False)
+    # InlineKeyboardMarkup as JSON
+    reply_markup = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # None once the message was given up, it stays in the table with its last error
+    next_attempt_datetime = Column(DateTime, nullable=True)
+    error = Column(String, nullable=True)
+    create_datetime = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index('ix_outbox_messages_next_attempt_datetime', 'next_attempt_datetime'),
+    )
+
+
+class OutboxMessageDTO(BaseModel):
+    id: int | None = None
+    method: OutboxMethod | None = None
+    chat_id: int | None = None
+    message_id: int | None = None
+    text: str | None = None
+    reply_markup: str | None = None
+    attempts: int | None = None
+    next_attempt_datetime: datetime | None = None
+    error: str | None = None
+    create_datetime: datetime | None = None
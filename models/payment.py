@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, Index
 
 import config
 from enums.cryptocurrency import Cryptocurrency
@@ -17,6 +17,11 @@ class Payment(Base):
     is_paid = Column(Boolean, nullable=False, default=False)
     expire_datetime = Column(DateTime)
 
+    __table_args__ = (
+        # every webhook event looks its payment up by the id of the processing
+        Index('ix_payments_processing_payment_id', 'processing_payment_id'),
+    )
+
 
 class ProcessingPaymentDTO(BaseModel):
     id: int | None = None
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Float, Integer, Enum
+
+from enums.rollup_period import RollupPeriod
+from models.base import Base
+
+
+# SalesRollup holds the not refunded buys of one hour or one day, maintained on every buy and refund
+class SalesRollup(Base):
+    __tablename__ = 'sales_rollups'
+
+    period = Column(Enum(RollupPeriod), primary_key=True)
+    period_start = Column(DateTime, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    items_sold = Column(Integer, nullable=False, default=0)
+    buys_count = Column(Integer, nullable=False, default=0)
+
+
+class SalesRollupDTO(BaseModel):
+    period: RollupPeriod | None = None
+    period_start: datetime | None = None
+    revenue: float | None = None
+    items_sold: int | None = None
+    buys_count: int | None = None
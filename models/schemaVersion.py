@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, DateTime, func
+
+from models.base import Base
+
+
+# one row per applied migration, see migrations.py
+class SchemaVersion(Base):
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+    applied_datetime = Column(DateTime, default=func.now())
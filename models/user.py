@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, DateTime, String, Boolean, Float, func, CheckConstraint
+from sqlalchemy import Column, Integer, DateTime, String, Boolean, Float, func, CheckConstraint, Index
 
 from models.base import Base
 
@@ -20,6 +20,8 @@ class User(Base):
     __table_args__ = (
         CheckConstraint('top_up_amount >= 0', name='check_top_up_amount_positive'),
         CheckConstraint('consume_records >= 0', name='check_consume_records_positive'),
+        # new users statistics are range queries on registered_at
+        Index('ix_users_registered_at', 'registered_at'),
     )
 
 
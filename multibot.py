@@ -17,6 +17,8 @@ from aiogram.webhook.aiohttp_server import (
     setup_application,
 )
 from db import create_db_and_tables
+from services.item import ItemService
+from services.outbox import OutboxService
 from utils.custom_filters import AdminIdFilter
 
 main_router_multibot = Router()
@@ -55,6 +57,8 @@ async def command_add_bot(message: Message, command: CommandObject, bot: Bot) ->
 async def on_startup(dispatcher: Dispatcher, bot: Bot):
     await bot.set_webhook(f"{BASE_URL}{MAIN_BOT_PATH}")
     await create_db_and_tables()
+    # notifications of all bots are queued in the outbox and sent by the main bot, as before the outbox
+    OutboxService.start(bot)
     for admin in config.ADMIN_ID_LIST:
         try:
             await bot.send_message(admin, 'Bot is working')
@@ -62,6 +66,10 @@ async def on_startup(dispatcher: Dispatcher, bot: Bot):
             logging.warning(e)
 
 
+async def on_shutdown():
+    ItemService.shutdown_parsing_pool()
+
+
 def main(main_router):
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
     session = AiohttpSession()
@@ -72,6 +80,7 @@ def main(main_router):
     main_dispatcher = Dispatcher(storage=storage)
     main_dispatcher.include_router(main_router_multibot)
     main_dispatcher.startup.register(on_startup)
+    main_dispatcher.shutdown.register(on_shutdown)
 
     multibot_dispatcher = Dispatcher(storage=storage)
     multibot_dispatcher.include_router(main_router)
@@ -1,17 +1,21 @@
 import datetime
 import hashlib
 import hmac
+import logging
 import re
 
 from fastapi import APIRouter, Request, HTTPException
 
 import config
 from db import get_db_session, session_commit
+from enums.balance_entry_type import BalanceEntryType
+from models.balanceEntry import BalanceEntryDTO
 from models.deposit import DepositDTO
 from models.payment import ProcessingPaymentDTO
+from repositories.balance import BalanceRepository
 from repositories.deposit import DepositRepository
 from repositories.payment import PaymentRepository
-from repositories.user import UserRepository
+from repositories.statisticsRollup import StatisticsRollupRepository
 from services.notification import NotificationService
 
 processing_router = APIRouter(prefix=f"{config.WEBHOOK_PATH}cryptoprocessing")
@@ -30,29 +34,34 @@ def __security_check(x_signature_header: str | None, payload: bytes):
 @processing_router.post("/event")
 async def fetch_crypto_event(payment_dto: ProcessingPaymentDTO, request: Request):
     request_body = await request.body()
-    print(f"EVENT RECEIVED:{request_body}")
+    logging.info(f"Crypto event received for payment {payment_dto.id}, isPaid={payment_dto.isPaid}")
     is_security_pass = __security_check(request.headers.get("X-Signature"), request_body)
     if is_security_pass is False:
         raise HTTPException(status_code=403, detail="Invalid signature")
     else:
         async with get_db_session() as session:
-            user = await PaymentRepository.get_user_by_payment_id(payment_dto.id, session)
-            table_payment_dto = await PaymentRepository.get_by_processing_payment_id(payment_dto.id, session)
-            if payment_dto.isPaid is True and table_payment_dto.is_paid is False:
-                user.top_up_amount += payment_dto.fiatAmount
-                await UserRepository.update(user, session)
-                table_payment_dto.is_paid = True
-                await PaymentRepository.update(table_payment_dto, session)
-                await DepositRepository.create(DepositDTO(
-                    user_id=user.id,
+            if payment_dto.isPaid is True:
+                table_payment_dto = await PaymentRepository.mark_paid(payment_dto.id, session)
+                if table_payment_dto is None:
+                    # already credited by an earlier delivery of this event
+                    return "200"
+                deposit_id = await DepositRepository.create(DepositDTO(
+                    user_id=table_payment_dto.user_id,
                     network=payment_dto.cryptoCurrency,
                     amount=int(payment_dto.cryptoAmount*pow(10, payment_dto.cryptoCurrency.get_divider())),
                     deposit_datetime=datetime.datetime.now()
                 ), session)
+                await BalanceRepository.add_entry(BalanceEntryDTO(user_id=table_payment_dto.user_id,
+                                                                  entry_type=BalanceEntryType.DEPOSIT,
+                                                                  amount=payment_dto.fiatAmount,
+                                                                  reference_id=deposit_id), session)
+                await StatisticsRollupRepository.add_deposit(deposit_id, session)
+                user = await PaymentRepository.get_user_by_payment_id(payment_dto.id, session)
+                await NotificationService.new_deposit(payment_dto, user, table_payment_dto, session)
                 await session_commit(session)
-                await NotificationService.new_deposit(payment_dto, user, table_payment_dto)
             elif payment_dto.isPaid is False:
-                await NotificationService.payment_expired(user, payment_dto, table_payment_dto)
-            else:
-                pass
+                user = await PaymentRepository.get_user_by_payment_id(payment_dto.id, session)
+                table_payment_dto = await PaymentRepository.get_by_processing_payment_id(payment_dto.id, session)
+                await NotificationService.payment_expired(user, payment_dto, table_payment_dto, session)
+                await session_commit(session)
             return "200"
@@ -0,0 +1,72 @@
+import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import session_execute
+from enums.analytics_bucket import AnalyticsBucket
+from enums.cryptocurrency import Cryptocurrency
+from models.depositRollup import DepositRollup
+from models.salesRollup import SalesRollup
+from models.user import User
+
+
+class AnalyticsRepository:
+    # every query returns its values keyed by the start of their bucket, formatted by __bucket_start
+
+    @staticmethod
+    def __bucket_start(column, bucket: AnalyticsBucket):
+        match bucket:
+            case AnalyticsBucket.HOUR:
+                return func.strftime("%Y-%m-%d %H:00", column)
+            case AnalyticsBucket.DAY:
+                return func.date(column)
+            case AnalyticsBucket.WEEK:
+                return func.date(column, "weekday 0", "-6 days")
+
+    @staticmethod
+    def format_bucket_start(time: datetime.datetime, bucket: AnalyticsBucket) -> str:
+        # same text as __bucket_start gives for a time at the start of its bucket
+        if bucket == AnalyticsBucket.HOUR:
+            return time.strftime("%Y-%m-%d %H:00")
+        return time.strftime("%Y-%m-%d")
+
+    @staticmethod
+    async def get_sales(time_from: datetime.datetime, time_to: datetime.datetime, bucket: AnalyticsBucket,
+                        session: Session | AsyncSession) -> dict[str, tuple[float, int]]:
+        # (revenue, buys count)
+        bucket_start = AnalyticsRepository.__bucket_start(SalesRollup.period_start, bucket)
+        stmt = (select(bucket_start, func.sum(SalesRollup.revenue), func.sum(SalesRollup.buys_count))
+                .where(SalesRollup.period == bucket.get_rollup_period(),
+                       SalesRollup.period_start >= time_from,
+                       SalesRollup.period_start < time_to)
+                .group_by(bucket_start))
+        sales = await session_execute(stmt, session)
+        return {bucket_start: (revenue, buys_count) for bucket_start, revenue, buys_count in sales.all()}
+
+    @staticmethod
+    async def get_deposits(time_from: datetime.datetime, time_to: datetime.datetime, bucket: AnalyticsBucket,
+                           session: Session | AsyncSession) -> dict[str, dict[Cryptocurrency, float]]:
+        # amounts in the smallest units of each network
+        bucket_start = AnalyticsRepository.__bucket_start(DepositRollup.period_start, bucket)
+        stmt = (select(bucket_start, DepositRollup.network, func.sum(DepositRollup.amount))
+                .where(DepositRollup.period == bucket.get_rollup_period(),
+                       DepositRollup.period_start >= time_from,
+                       DepositRollup.period_start < time_to)
+                .group_by(bucket_start, DepositRollup.network))
+        deposits = await session_execute(stmt, session)
+        deposits_by_bucket = {}
+        for bucket_start, network, amount in deposits.all():
+            deposits_by_bucket.setdefault(bucket_start, {})[network] = amount
+        return deposits_by_bucket
+
+    @staticmethod
+    async def get_new_users(time_from: datetime.datetime, time_to: datetime.datetime, bucket: AnalyticsBucket,
+                            session: Session | AsyncSession) -> dict[str, int]:
+        bucket_start = AnalyticsRepository.__bucket_start(User.registered_at, bucket)
+        stmt = (select(bucket_start, func.count(User.id))
+                .where(User.registered_at >= time_from, User.registered_at < time_to)
+                .group_by(bucket_start))
+        new_users = await session_execute(stmt, session)
+        return {bucket_start: users_count for bucket_start, users_count in new_users.all()}
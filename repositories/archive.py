@@ -0,0 +1,39 @@
+import datetime
+
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import session_execute
+from models.archivedItem import ArchivedItem
+from models.buy import Buy
+from models.buyItem import BuyItem
+from models.item import Item
+
+
+class ArchiveRepository:
+
+    @staticmethod
+    async def get_archivable_item_ids(sold_before: datetime.datetime, limit: int,
+                                      session: Session | AsyncSession) -> list[int]:
+        stmt = (select(Item.id)
+                .join(BuyItem, BuyItem.item_id == Item.id)
+                .join(Buy, Buy.id == BuyItem.buy_id)
+                .where(Item.is_sold == True, Buy.buy_datetime < sold_before)
+                .limit(limit))
+        item_ids = await session_execute(stmt, session)
+        return item_ids.scalars().all()
+
+    @staticmethod
+    async def archive_items(item_ids: list[int], session: Session | AsyncSession):
+        # copy the items with the buy they belong to, then remove them from the hot tables
+        await session_execute(insert(ArchivedItem).from_select(
+            [ArchivedItem.buy_id, ArchivedItem.category_id, ArchivedItem.subcategory_id, ArchivedItem.private_data,
+             ArchivedItem.price, ArchivedItem.description],
+            select(BuyItem.buy_id, Item.category_id, Item.subcategory_id, Item.private_data, Item.price,
+                   Item.description)
+            .join(BuyItem, BuyItem.item_id == Item.id)
+            .where(Item.id.in_(item_ids))
+            .order_by(Item.id)), session)
+        await session_execute(delete(BuyItem).where(BuyItem.item_id.in_(item_ids)), session)
+        await session_execute(delete(Item).where(Item.id.in_(item_ids)), session)
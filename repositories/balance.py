@@ -0,0 +1,61 @@
+from sqlalchemy import select, update, insert, func, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import session_execute
+from enums.balance_entry_type import BalanceEntryType
+from models.balanceEntry import BalanceEntry, BalanceEntryDTO, BalanceMismatchDTO
+from models.user import User
+
+top_up_entry_types = [entry_type for entry_type in BalanceEntryType if entry_type.is_top_up()]
+
+
+class BalanceRepository:
+    # differences below half a cent are float rounding of the sums
+    reconciliation_tolerance = 0.005
+
+    @staticmethod
+    async def add_entry(balance_entry_dto: BalanceEntryDTO, session: Session | AsyncSession,
+                        require_funds: bool = False) -> bool:
+        # the ledger line and the cached balance are written in the transaction of the caller,
+        # the balance is incremented in SQL so concurrent entries of the same user can't overwrite each other.
+        # With require_funds a debit is only applied while the balance covers it, checked by the same UPDATE,
+        # False means nothing was written
+        if balance_entry_dto.entry_type.is_top_up():
+            values = {"top_up_amount": User.top_up_amount + balance_entry_dto.amount}
+        else:
+            values = {"consume_records": User.consume_records - balance_entry_dto.amount}
+        stmt = update(User).where(User.id == balance_entry_dto.user_id).values(**values)
+        if require_funds:
+            stmt = stmt.where(User.top_up_amount - User.consume_records + balance_entry_dto.amount >= 0)
+        user_updated = await session_execute(stmt, session)
+        if user_updated.rowcount == 0:
+            return False
+        stmt = insert(BalanceEntry).values(**balance_entry_dto.model_dump(exclude_none=True))
+        await session_execute(stmt, session)
+        return True
+
+    @staticmethod
+    async def get_mismatches(session: Session | AsyncSession) -> list[BalanceMismatchDTO]:
+        # one aggregate over the ledger, compared with the cached balances of every user
+        is_top_up = BalanceEntry.entry_type.in_(top_up_entry_types)
+        ledger = (select(BalanceEntry.user_id,
+                         func.total(case((is_top_up, BalanceEntry.amount), else_=0)).label("top_up_amount"),
+                         func.total(case((is_top_up, 0), else_=-BalanceEntry.amount)).label("consume_records"))
+                  .group_by(BalanceEntry.user_id)
+                  .subquery())
+        top_up_amount = func.coalesce(User.top_up_amount, 0)
+        consume_records = func.coalesce(User.consume_records, 0)
+        ledger_top_up_amount = func.coalesce(ledger.c.top_up_amount, 0)
+        ledger_consume_records = func.coalesce(ledger.c.consume_records, 0)
+        stmt = (select(User.id.label("user_id"),
+                       top_up_amount.label("top_up_amount"),
+                       consume_records.label("consume_records"),
+                       ledger_top_up_amount.label("ledger_top_up_amount"),
+                       ledger_consume_records.label("ledger_consume_records"))
+                .outerjoin(ledger, ledger.c.user_id == User.id)
+                .where(or_(func.abs(top_up_amount - ledger_top_up_amount) > BalanceRepository.reconciliation_tolerance,
+                           func.abs(consume_records - ledger_consume_records) >
+                           BalanceRepository.reconciliation_tolerance)))
+        mismatches = await session_execute(stmt, session)
+        return [BalanceMismatchDTO.model_validate(mismatch) for mismatch in mismatches.mappings().all()]
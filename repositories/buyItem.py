@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
@@ -7,13 +7,9 @@ from models.buyItem import BuyItem, BuyItemDTO
 
 
 class BuyItemRepository:
-    @staticmethod
-    async def get_single_by_buy_id(buy_id: int, session: Session | AsyncSession):
-        stmt = select(BuyItem).where(BuyItem.buy_id == buy_id).limit(1)
-        item_subcategory = await session_execute(stmt, session)
-        return BuyItemDTO.model_validate(item_subcategory.scalar(), from_attributes=True)
-
     @staticmethod
     async def create_many(buy_item_dto_list: list[BuyItemDTO], session: Session | AsyncSession):
-        for buy_item_dto in buy_item_dto_list:
-            session.add(BuyItem(**buy_item_dto.model_dump()))
+        if len(buy_item_dto_list) == 0:
+            return
+        await session_execute(insert(BuyItem), session, [buy_item_dto.model_dump(exclude={"id"})
+                                                          for buy_item_dto in buy_item_dto_list])
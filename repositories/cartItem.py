@@ -1,13 +1,15 @@
 import math
 
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 import config
 from db import session_flush, session_execute
 from models.cart import Cart
-from models.cartItem import CartItemDTO, CartItem
+from models.cartItem import CartItemDTO, CartItem, CheckoutPlanDTO, CheckoutLineDTO
+from models.item import Item
+from models.subcategory import Subcategory
 
 
 class CartItemRepository:
@@ -45,3 +47,30 @@ class CartItemRepository:
     async def remove_from_cart(cart_item_id: int, session: AsyncSession | Session):
         stmt = delete(CartItem).where(CartItem.id == cart_item_id)
         await session_execute(stmt, session)
+
+    @staticmethod
+    async def remove_many_from_cart(cart_item_ids: list[int], session: AsyncSession | Session):
+        stmt = delete(CartItem).where(CartItem.id.in_(cart_item_ids))
+        await session_execute(stmt, session)
+
+    @staticmethod
+    async def get_checkout_plan(user_id: int, session: AsyncSession | Session) -> CheckoutPlanDTO:
+        # prices and stock of every cart line in one grouped query over the unsold items of each line
+        stmt = (select(CartItem.id.label("cart_item_id"),
+                       CartItem.category_id,
+                       CartItem.subcategory_id,
+                       CartItem.quantity,
+                       Subcategory.name.label("subcategory_name"),
+                       func.coalesce(func.max(Item.price), 0.0).label("price"),
+                       func.count(Item.id).label("available_qty"))
+                .join(Cart, CartItem.cart_id == Cart.id)
+                .join(Subcategory, Subcategory.id == CartItem.subcategory_id)
+                .outerjoin(Item, and_(Item.category_id == CartItem.category_id,
+                                      Item.subcategory_id == CartItem.subcategory_id,
+                                      Item.is_sold == False))
+                .where(Cart.user_id == user_id)
+                .group_by(CartItem.id)
+                .order_by(CartItem.id))
+        lines = await session_execute(stmt, session)
+        return CheckoutPlanDTO(lines=[CheckoutLineDTO.model_validate(line, from_attributes=True)
+                                      for line in lines.mappings().all()])
@@ -1,6 +1,6 @@
 import math
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
@@ -67,3 +67,18 @@ class CategoryRepository:
             return new_category_obj
         else:
             return category
+
+    @staticmethod
+    async def get_or_create_many(category_names: set[str], session: Session | AsyncSession) -> dict[str, int]:
+        stmt = (select(Category.name, func.min(Category.id))
+                .where(Category.name.in_(category_names))
+                .group_by(Category.name))
+        category_ids = await session_execute(stmt, session)
+        category_ids = {name: category_id for name, category_id in category_ids.all()}
+        new_category_names = category_names - category_ids.keys()
+        if len(new_category_names) > 0:
+            insert_stmt = insert(Category).returning(Category.name, Category.id)
+            new_category_ids = await session_execute(insert_stmt, session,
+                                                     [{"name": name} for name in new_category_names])
+            category_ids.update({name: category_id for name, category_id in new_category_ids.all()})
+        return category_ids
@@ -0,0 +1,79 @@
+import datetime
+from typing import AsyncGenerator
+
+from sqlalchemy import select, Column, Row, Select, union_all, null
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import session_stream
+from enums.export_table import ExportTable
+from models.archivedItem import ArchivedItem
+from models.buy import Buy
+from models.buyItem import BuyItem
+from models.deposit import Deposit
+from models.payment import Payment
+from models.user import User
+
+
+class ExportRepository:
+
+    @staticmethod
+    def get_columns(export_table: ExportTable) -> list[Column]:
+        match export_table:
+            case ExportTable.BUYS:
+                return list(Buy.__table__.columns)
+            case ExportTable.BUY_ITEMS:
+                return list(BuyItem.__table__.columns)
+            case ExportTable.DEPOSITS:
+                return list(Deposit.__table__.columns)
+            case ExportTable.PAYMENTS:
+                return list(Payment.__table__.columns)
+            case ExportTable.USERS:
+                return list(User.__table__.columns)
+
+    @staticmethod
+    def __get_datetime_column(export_table: ExportTable) -> Column:
+        # buy items have no time of their own and are filtered by the time of their buy
+        match export_table:
+            case ExportTable.BUYS | ExportTable.BUY_ITEMS:
+                return Buy.buy_datetime
+            case ExportTable.DEPOSITS:
+                return Deposit.deposit_datetime
+            case ExportTable.PAYMENTS:
+                return Payment.expire_datetime
+            case ExportTable.USERS:
+                return User.registered_at
+
+    @staticmethod
+    def __filter_time(stmt: Select, datetime_column: Column, time_from: datetime.datetime | None,
+                      time_to: datetime.datetime | None) -> Select:
+        if time_from is not None:
+            stmt = stmt.where(datetime_column >= time_from)
+        if time_to is not None:
+            stmt = stmt.where(datetime_column < time_to)
+        return stmt
+
+    @staticmethod
+    async def stream(export_table: ExportTable, time_from: datetime.datetime | None,
+                     time_to: datetime.datetime | None, partition_size: int,
+                     session: Session | AsyncSession) -> AsyncGenerator[list[Row], None]:
+        columns = ExportRepository.get_columns(export_table)
+        datetime_column = ExportRepository.__get_datetime_column(export_table)
+        if export_table == ExportTable.BUY_ITEMS:
+            # sold items moved to the archive lost their buy item row, they are exported from the archive
+            # with their buy, the buy item and item ids no longer exist and stay empty.
+            # SQLite orders a compound select only by output column names, so both sides are labelled
+            buy_items = ExportRepository.__filter_time(
+                select(*[column.label(column.name) for column in columns]).join(Buy, Buy.id == BuyItem.buy_id),
+                datetime_column, time_from, time_to)
+            archived_items = ExportRepository.__filter_time(
+                select(null().label("id"), ArchivedItem.buy_id.label("buy_id"), null().label("item_id"))
+                .join(Buy, Buy.id == ArchivedItem.buy_id),
+                datetime_column, time_from, time_to)
+            stmt = union_all(buy_items, archived_items)
+            stmt = stmt.order_by(stmt.selected_columns.buy_id, stmt.selected_columns.id)
+        else:
+            stmt = ExportRepository.__filter_time(select(*columns).order_by(columns[0]), datetime_column,
+                                                  time_from, time_to)
+        async for partition in session_stream(stmt, session, partition_size):
+            yield partition
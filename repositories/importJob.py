@@ -0,0 +1,83 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import session_execute, session_flush
+from enums.import_job_status import ImportJobStatus
+from models.importJob import ImportJob, ImportJobDTO
+from models.importJobFile import ImportJobFile, ImportJobFileDTO
+from utils.items_parser import ImportCursor
+
+
+class ImportJobRepository:
+
+    @staticmethod
+    async def create(import_job_dto: ImportJobDTO, session: Session | AsyncSession) -> int:
+        import_job = ImportJob(**import_job_dto.model_dump())
+        session.add(import_job)
+        await session_flush(session)
+        return import_job.id
+
+    @staticmethod
+    async def get_by_id(import_job_id: int, session: Session | AsyncSession) -> ImportJobDTO | None:
+        stmt = select(ImportJob).where(ImportJob.id == import_job_id)
+        import_job = await session_execute(stmt, session)
+        import_job = import_job.scalar()
+        if import_job is None:
+            return None
+        return ImportJobDTO.model_validate(import_job, from_attributes=True)
+
+    @staticmethod
+    async def get_running(session: Session | AsyncSession) -> list[ImportJobDTO]:
+        stmt = select(ImportJob).where(ImportJob.status == ImportJobStatus.RUNNING)
+        import_jobs = await session_execute(stmt, session)
+        return [ImportJobDTO.model_validate(import_job, from_attributes=True)
+                for import_job in import_jobs.scalars().all()]
+
+    @staticmethod
+    async def update_status(import_job_id: int, status: ImportJobStatus, error: str | None,
+                            session: Session | AsyncSession):
+        stmt = update(ImportJob).where(ImportJob.id == import_job_id).values(status=status, error=error)
+        await session_execute(stmt, session)
+
+    @staticmethod
+    async def add_file(import_job_file_dto: ImportJobFileDTO, session: Session | AsyncSession):
+        session.add(ImportJobFile(**import_job_file_dto.model_dump()))
+        await session_flush(session)
+
+    @staticmethod
+    async def get_next_file(import_job_id: int, session: Session | AsyncSession) -> ImportJobFileDTO | None:
+        stmt = (select(ImportJobFile)
+                .where(ImportJobFile.job_id == import_job_id, ImportJobFile.is_done == False)
+                .order_by(ImportJobFile.id)
+                .limit(1))
+        import_job_file = await session_execute(stmt, session)
+        import_job_file = import_job_file.scalar()
+        if import_job_file is None:
+            return None
+        return ImportJobFileDTO.model_validate(import_job_file, from_attributes=True)
+
+    @staticmethod
+    async def get_files_progress(import_job_id: int, session: Session | AsyncSession) -> tuple[int, int]:
+        # (done files, all files)
+        stmt = (select(func.count(ImportJobFile.id).filter(ImportJobFile.is_done == True),
+                       func.count(ImportJobFile.id))
+                .where(ImportJobFile.job_id == import_job_id))
+        files_progress = await session_execute(stmt, session)
+        return tuple(files_progress.one())
+
+    @staticmethod
+    async def checkpoint(import_job_file: ImportJobFileDTO, cursor: ImportCursor | None, added_count: int,
+                         skipped_count: int, session: Session | AsyncSession):
+        # must be committed together with the batch it describes
+        if cursor is None:
+            file_values = {"is_done": True}
+        else:
+            file_values = {"cursor_offset": cursor.offset, "cursor_number": cursor.number}
+        await session_execute(update(ImportJobFile)
+                              .where(ImportJobFile.id == import_job_file.id)
+                              .values(**file_values), session)
+        await session_execute(update(ImportJob)
+                              .where(ImportJob.id == import_job_file.job_id)
+                              .values(added_count=ImportJob.added_count + added_count,
+                                      skipped_count=ImportJob.skipped_count + skipped_count), session)
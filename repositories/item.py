@@ -1,10 +1,27 @@
-from sqlalchemy import select, func, update, delete
+from sqlalchemy import select, func, update, delete, and_, union_all, true, false, Row
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from db import session_execute
+from models.archivedItem import ArchivedItem
 from models.buyItem import BuyItem
-from models.item import Item, ItemDTO
+from models.cart import Cart
+from models.cartItem import CartItem
+from models.category import Category
+from models.item import Item, ItemDTO, ItemStockDTO
+from models.subcategory import Subcategory
+
+# full column projection of ItemDTO
+item_columns = (Item.id, Item.category_id, Item.subcategory_id, Item.private_data, Item.price, Item.is_sold,
+                Item.is_new, Item.description)
+item_column_names = tuple(column.key for column in item_columns)
+
+
+def to_item_dto(row: Row) -> ItemDTO:
+    # rows start with item_columns, each value is passed by the name of its column and extra columns are ignored,
+    # so item_columns doesn't have to follow the field order of ItemDTO
+    return ItemDTO(**dict(zip(item_column_names, row)))
 
 
 class ItemRepository:
@@ -20,53 +37,86 @@ class ItemRepository:
 
     @staticmethod
     async def get_available_qty(item_dto: ItemDTO, session: Session | AsyncSession) -> int:
-        sub_stmt = (select(Item)
-                    .where(Item.category_id == item_dto.category_id,
-                           Item.subcategory_id == item_dto.subcategory_id,
-                           Item.is_sold == False))
-        stmt = select(func.count()).select_from(sub_stmt)
+        stmt = (select(func.count(Item.id))
+                .where(Item.category_id == item_dto.category_id,
+                       Item.subcategory_id == item_dto.subcategory_id,
+                       Item.is_sold == False))
         available_qty = await session_execute(stmt, session)
         return available_qty.scalar()
 
     @staticmethod
-    async def get_single(category_id: int, subcategory_id: int, session: Session | AsyncSession):
-        stmt = (select(Item)
+    async def get_single(category_id: int, subcategory_id: int, session: Session | AsyncSession) -> ItemDTO:
+        # catalog projection, private_data is only loaded for delivery
+        stmt = (select(Item.id, Item.category_id, Item.subcategory_id, Item.price, Item.description)
                 .where(Item.category_id == category_id,
                        Item.subcategory_id == subcategory_id,
                        Item.is_sold == False)
                 .limit(1))
         item = await session_execute(stmt, session)
-        return ItemDTO.model_validate(item.scalar(), from_attributes=True)
+        return ItemDTO(**item.mappings().first())
 
     @staticmethod
     async def get_by_id(item_id: int, session: Session | AsyncSession) -> ItemDTO:
-        stmt = select(Item).where(Item.id == item_id)
+        stmt = (select(Item.id, Item.category_id, Item.subcategory_id, Item.price, Item.is_sold, Item.is_new,
+                       Item.description)
+                .where(Item.id == item_id))
         item = await session_execute(stmt, session)
-        return ItemDTO.model_validate(item.scalar(), from_attributes=True)
+        return ItemDTO(**item.mappings().first())
 
     @staticmethod
     async def get_purchased_items(category_id: int, subcategory_id: int, quantity: int, session: Session | AsyncSession) -> list[ItemDTO]:
-        stmt = (select(Item)
+        stmt = (select(*item_columns)
                 .where(Item.category_id == category_id, Item.subcategory_id == subcategory_id,
                        Item.is_sold == False).limit(quantity))
         items = await session_execute(stmt, session)
-        return [ItemDTO.model_validate(item, from_attributes=True) for item in items.scalars().all()]
+        return [to_item_dto(item) for item in items.all()]
+
+    @staticmethod
+    async def get_purchased_items_by_cart(user_id: int, session: Session | AsyncSession) -> dict[int, list[ItemDTO]]:
+        # picks `quantity` unsold items for every line of the user's cart in a single query
+        ranked = (select(Item.id,
+                         CartItem.id.label("cart_item_id"),
+                         CartItem.quantity,
+                         func.row_number().over(partition_by=CartItem.id, order_by=Item.id).label("position"))
+                  .select_from(CartItem)
+                  .join(Cart, CartItem.cart_id == Cart.id)
+                  .join(Item, and_(Item.category_id == CartItem.category_id,
+                                   Item.subcategory_id == CartItem.subcategory_id,
+                                   Item.is_sold == False))
+                  .where(Cart.user_id == user_id)
+                  .subquery())
+        stmt = (select(*item_columns, ranked.c.cart_item_id)
+                .join(ranked, ranked.c.id == Item.id)
+                .where(ranked.c.position <= ranked.c.quantity)
+                .order_by(Item.id))
+        items = await session_execute(stmt, session)
+        purchased_items = {}
+        for item in items.all():
+            purchased_items.setdefault(item.cart_item_id, []).append(to_item_dto(item))
+        return purchased_items
 
     @staticmethod
     async def update(item_dto_list: list[ItemDTO], session: Session | AsyncSession):
-        for item in item_dto_list:
-            stmt = update(Item).where(Item.id == item.id).values(**item.model_dump())
-            await session_execute(stmt, session)
+        # bulk UPDATE by primary key (executemany), only the mutable flags are written
+        if len(item_dto_list) == 0:
+            return
+        await session_execute(update(Item), session, [{"id": item.id,
+                                                        "is_sold": item.is_sold,
+                                                        "is_new": item.is_new} for item in item_dto_list])
 
     @staticmethod
     async def get_by_buy_id(buy_id: int, session: Session | AsyncSession) -> list[ItemDTO]:
-        stmt = (
-            select(Item)
+        # items of old buys may already be in the archive
+        stmt = union_all(
+            select(*item_columns)
             .join(BuyItem, BuyItem.item_id == Item.id)
-            .where(BuyItem.buy_id == buy_id)
+            .where(BuyItem.buy_id == buy_id),
+            select(ArchivedItem.id, ArchivedItem.category_id, ArchivedItem.subcategory_id, ArchivedItem.private_data,
+                   ArchivedItem.price, true(), false(), ArchivedItem.description)
+            .where(ArchivedItem.buy_id == buy_id)
         )
         result = await session_execute(stmt, session)
-        return [ItemDTO.model_validate(item, from_attributes=True) for item in result.scalars().all()]
+        return [to_item_dto(item) for item in result.all()]
 
     @staticmethod
     async def set_not_new(session: Session | AsyncSession):
@@ -84,20 +134,30 @@ class ItemRepository:
         await session_execute(stmt, session)
 
     @staticmethod
-    async def add_many(items: list[ItemDTO], session: Session | AsyncSession):
-        items = [Item(**item.model_dump()) for item in items]
-        session.add_all(items)
+    async def add_many(items: list[dict], session: Session | AsyncSession) -> int:
+        # items already in unsold stock are skipped by the unique private_data_hash index,
+        # only inserted rows are returned, so the result is the number of added items
+        stmt = insert(Item).on_conflict_do_nothing().returning(Item.id)
+        item_ids = await session_execute(stmt, session, items)
+        return len(item_ids.all())
 
     @staticmethod
-    async def get_new(session: Session | AsyncSession) -> list[ItemDTO]:
-        stmt = select(Item).where(Item.is_new == True)
-        items = await session_execute(stmt, session)
-        return [ItemDTO.model_validate(item, from_attributes=True) for item in items.scalars().all()]
+    async def get_unsold_hashes(hashes: list[bytes], session: Session | AsyncSession) -> set[bytes]:
+        stmt = select(Item.private_data_hash).where(Item.private_data_hash.in_(hashes), Item.is_sold == False)
+        existing_hashes = await session_execute(stmt, session)
+        return set(existing_hashes.scalars().all())
 
     @staticmethod
-    async def get_in_stock(session: Session | AsyncSession) -> list[ItemDTO]:
-        stmt = select(Item).where(Item.is_sold == False)
-        items = await session_execute(stmt, session)
-        return [ItemDTO.model_validate(item, from_attributes=True) for item in items.scalars().all()]
-
-
+    async def get_stock(only_new: bool, session: Session | AsyncSession) -> list[ItemStockDTO]:
+        # new items (including already sold ones) or unsold items counted per category and subcategory
+        stmt = (select(Category.name.label("category_name"),
+                       Subcategory.name.label("subcategory_name"),
+                       func.count(Item.id).label("quantity"),
+                       func.max(Item.price).label("price"))
+                .join(Category, Category.id == Item.category_id)
+                .join(Subcategory, Subcategory.id == Item.subcategory_id)
+                .where(Item.is_new == True if only_new else Item.is_sold == False)
+                .group_by(Category.id, Subcategory.id)
+                .order_by(Category.name, Subcategory.name))
+        stock = await session_execute(stmt, session)
+        return [ItemStockDTO.model_validate(row, from_attributes=True) for row in stock.all()]
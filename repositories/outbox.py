@@ -0,0 +1,45 @@
+import datetime
+
+from sqlalchemy import select, insert, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db import session_execute
+from models.outboxMessage import OutboxMessage, OutboxMessageDTO
+
+
+class OutboxRepository:
+    @staticmethod
+    async def add_many(outbox_message_dto_list: list[OutboxMessageDTO], session: AsyncSession | Session):
+        if len(outbox_message_dto_list) == 0:
+            return
+        now = datetime.datetime.now()
+        await session_execute(insert(OutboxMessage),
+                              session,
+                              [{**outbox_message_dto.model_dump(exclude_none=True), "next_attempt_datetime": now}
+                               for outbox_message_dto in outbox_message_dto_list])
+
+    @staticmethod
+    async def get_due(limit: int, session: AsyncSession | Session) -> list[OutboxMessageDTO]:
+        # oldest first, so the messages of one chat are sent in the order they were written
+        stmt = (select(OutboxMessage)
+                .where(OutboxMessage.next_attempt_datetime <= datetime.datetime.now())
+                .order_by(OutboxMessage.id)
+                .limit(limit))
+        outbox_messages = await session_execute(stmt, session)
+        return [OutboxMessageDTO.model_validate(outbox_message, from_attributes=True)
+                for outbox_message in outbox_messages.scalars().all()]
+
+    @staticmethod
+    async def delete(outbox_message_id: int, session: AsyncSession | Session):
+        stmt = delete(OutboxMessage).where(OutboxMessage.id == outbox_message_id)
+        await session_execute(stmt, session)
+
+    @staticmethod
+    async def reschedule(outbox_message_dto: OutboxMessageDTO, session: AsyncSession | Session):
+        stmt = (update(OutboxMessage)
+                .where(OutboxMessage.id == outbox_message_dto.id)
+                .values(attempts=outbox_message_dto.attempts,
+                        next_attempt_datetime=outbox_message_dto.next_attempt_datetime,
+                        error=outbox_message_dto.error))
+        await session_execute(stmt, session)
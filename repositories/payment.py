@@ -37,6 +37,20 @@ class PaymentRepository:
         payment = await session_execute(stmt, session)
         return TablePaymentDTO.model_validate(payment.scalar_one(), from_attributes=True)
 
+    @staticmethod
+    async def mark_paid(processing_payment_id: int, session: AsyncSession | Session) -> TablePaymentDTO | None:
+        # the conditional update is the gate against repeated and concurrent deliveries of the same event,
+        # only the first one gets the payment back, until its transaction commits the others wait for the lock
+        stmt = (update(Payment)
+                .where(Payment.processing_payment_id == processing_payment_id, Payment.is_paid == False)
+                .values(is_paid=True)
+                .returning(Payment))
+        payment = await session_execute(stmt, session)
+        payment = payment.scalar()
+        if payment is None:
+            return None
+        return TablePaymentDTO.model_validate(payment, from_attributes=True)
+
     @staticmethod
     async def get_unexpired_unpaid_payments(user_id: int, session: AsyncSession | Session):
         sub_stmt = (select(Payment)
@@ -46,10 +60,3 @@ class PaymentRepository:
         stmt = select(func.count()).select_from(sub_stmt)
         count = await session_execute(stmt, session)
         return count.scalar_one()
-
-    @staticmethod
-    async def update(payment_dto: TablePaymentDTO, session: AsyncSession | Session):
-        stmt = (update(Payment)
-                .where(Payment.id == payment_dto.id)
-                .values(**payment_dto.model_dump()))
-        await session_execute(stmt, session)
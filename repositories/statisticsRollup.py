@@ -0,0 +1,93 @@
+import datetime
+
+from sqlalchemy import select, func, literal, or_, and_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from callbacks import StatisticsTimeDelta
+from db import session_execute
+from enums.rollup_period import RollupPeriod
+from models.buy import Buy
+from models.deposit import Deposit
+from models.depositRollup import DepositRollup, DepositRollupDTO
+from models.salesRollup import SalesRollup, SalesRollupDTO
+
+
+class StatisticsRollupRepository:
+
+    @staticmethod
+    async def add_buy(buy_id: int, session: Session | AsyncSession, sign: int = 1):
+        # sign=-1 takes a refunded buy out of the rollups of the time it was made
+        for period in RollupPeriod:
+            rows = (select(literal(period, SalesRollup.period.type),
+                           func.strftime(period.get_strftime_format(), Buy.buy_datetime),
+                           Buy.total_price * sign,
+                           Buy.quantity * sign,
+                           literal(sign))
+                    .where(Buy.id == buy_id))
+            stmt = insert(SalesRollup).from_select([SalesRollup.period, SalesRollup.period_start, SalesRollup.revenue,
+                                                    SalesRollup.items_sold, SalesRollup.buys_count], rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SalesRollup.period, SalesRollup.period_start],
+                set_={"revenue": SalesRollup.revenue + stmt.excluded.revenue,
+                      "items_sold": SalesRollup.items_sold + stmt.excluded.items_sold,
+                      "buys_count": SalesRollup.buys_count + stmt.excluded.buys_count})
+            await session_execute(stmt, session)
+
+    @staticmethod
+    async def add_deposit(deposit_id: int, session: Session | AsyncSession):
+        for period in RollupPeriod:
+            rows = (select(literal(period, DepositRollup.period.type),
+                           func.strftime(period.get_strftime_format(), Deposit.deposit_datetime),
+                           Deposit.network,
+                           Deposit.amount,
+                           literal(1))
+                    .where(Deposit.id == deposit_id))
+            stmt = insert(DepositRollup).from_select([DepositRollup.period, DepositRollup.period_start,
+                                                      DepositRollup.network, DepositRollup.amount,
+                                                      DepositRollup.deposits_count], rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DepositRollup.period, DepositRollup.period_start, DepositRollup.network],
+                set_={"amount": DepositRollup.amount + stmt.excluded.amount,
+                      "deposits_count": DepositRollup.deposits_count + stmt.excluded.deposits_count})
+            await session_execute(stmt, session)
+
+    @staticmethod
+    def __window(rollup: type[SalesRollup] | type[DepositRollup], timedelta: StatisticsTimeDelta):
+        # whole days inside the window are read from daily rows and the partial days at its ends from hourly rows,
+        # so a month is at most ~80 rows; the start is rounded down to the hour
+        current_time = datetime.datetime.now()
+        window_start = (current_time - datetime.timedelta(days=timedelta.value)).replace(minute=0, second=0,
+                                                                                         microsecond=0)
+        today = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day = window_start.replace(hour=0)
+        if first_day < window_start:
+            first_day += datetime.timedelta(days=1)
+        return or_(and_(rollup.period == RollupPeriod.HOUR,
+                        rollup.period_start >= window_start,
+                        rollup.period_start < first_day),
+                   and_(rollup.period == RollupPeriod.DAY,
+                        rollup.period_start >= first_day,
+                        rollup.period_start < today),
+                   and_(rollup.period == RollupPeriod.HOUR,
+                        rollup.period_start >= today))
+
+    @staticmethod
+    async def get_sales(timedelta: StatisticsTimeDelta, session: Session | AsyncSession) -> SalesRollupDTO:
+        stmt = (select(func.coalesce(func.sum(SalesRollup.revenue), 0.0).label("revenue"),
+                       func.coalesce(func.sum(SalesRollup.items_sold), 0).label("items_sold"),
+                       func.coalesce(func.sum(SalesRollup.buys_count), 0).label("buys_count"))
+                .where(StatisticsRollupRepository.__window(SalesRollup, timedelta)))
+        sales = await session_execute(stmt, session)
+        return SalesRollupDTO.model_validate(sales.mappings().one())
+
+    @staticmethod
+    async def get_deposits(timedelta: StatisticsTimeDelta, session: Session | AsyncSession) -> list[DepositRollupDTO]:
+        stmt = (select(DepositRollup.network,
+                       func.sum(DepositRollup.amount).label("amount"),
+                       func.sum(DepositRollup.deposits_count).label("deposits_count"))
+                .where(StatisticsRollupRepository.__window(DepositRollup, timedelta))
+                .group_by(DepositRollup.network))
+        deposits = await session_execute(stmt, session)
+        return [DepositRollupDTO.model_validate(deposit) for deposit in deposits.mappings().all()]
@@ -1,6 +1,6 @@
 import math
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
@@ -83,3 +83,17 @@ class SubcategoryRepository:
         else:
             return subcategory
 
+    @staticmethod
+    async def get_or_create_many(subcategory_names: set[str], session: Session | AsyncSession) -> dict[str, int]:
+        stmt = (select(Subcategory.name, func.min(Subcategory.id))
+                .where(Subcategory.name.in_(subcategory_names))
+                .group_by(Subcategory.name))
+        subcategory_ids = await session_execute(stmt, session)
+        subcategory_ids = {name: subcategory_id for name, subcategory_id in subcategory_ids.all()}
+        new_subcategory_names = subcategory_names - subcategory_ids.keys()
+        if len(new_subcategory_names) > 0:
+            insert_stmt = insert(Subcategory).returning(Subcategory.name, Subcategory.id)
+            new_subcategory_ids = await session_execute(insert_stmt, session,
+                                                        [{"name": name} for name in new_subcategory_names])
+            subcategory_ids.update({name: subcategory_id for name, subcategory_id in new_subcategory_ids.all()})
+        return subcategory_ids
@@ -1,15 +1,15 @@
 import datetime
-import math
 
 from sqlalchemy import select, update, func, or_
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-import config
 from callbacks import StatisticsTimeDelta
 from db import session_execute, session_flush
 
 from models.user import UserDTO, User
+from utils.keyset_pagination import KeysetPage, keyset_seek, keyset_page
 
 
 class UserRepository:
@@ -25,7 +25,8 @@ class UserRepository:
 
     @staticmethod
     async def update(user_dto: UserDTO, session: Session | AsyncSession) -> None:
-        user_dto_dict = user_dto.model_dump()
+        # balances are only changed through BalanceRepository.add_entry, a stale DTO must not overwrite them
+        user_dto_dict = user_dto.model_dump(exclude={"top_up_amount", "consume_records"})
         none_keys = [k for k, v in user_dto_dict.items() if v is None]
         for k in none_keys:
             user_dto_dict.pop(k)
@@ -39,6 +40,17 @@ class UserRepository:
         await session_flush(session)
         return user.id
 
+    @staticmethod
+    async def upsert(user_dto: UserDTO, session: Session | AsyncSession) -> None:
+        # the conflict branch only rewrites the row when the username changed or the user was unreachable
+        stmt = insert(User).values(telegram_id=user_dto.telegram_id, telegram_username=user_dto.telegram_username)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={"telegram_username": stmt.excluded.telegram_username, "can_receive_messages": True},
+            where=or_(User.telegram_username.is_distinct_from(stmt.excluded.telegram_username),
+                      User.can_receive_messages == False))
+        await session_execute(stmt, session)
+
     @staticmethod
     async def get_active(session: Session | AsyncSession) -> list[UserDTO]:
         stmt = select(User).where(User.can_receive_messages == True)
@@ -63,30 +75,21 @@ class UserRepository:
             return UserDTO.model_validate(user, from_attributes=True)
 
     @staticmethod
-    async def get_by_timedelta(timedelta: StatisticsTimeDelta, page: int, session: Session | AsyncSession) -> tuple[list[UserDTO], int]:
+    async def get_by_timedelta(timedelta: StatisticsTimeDelta, page: int, session: Session | AsyncSession) \
+            -> tuple[list[UserDTO], KeysetPage]:
         current_time = datetime.datetime.now()
         timedelta = datetime.timedelta(days=timedelta.value)
         time_interval = current_time - timedelta
-        users_stmt = (select(User)
-                      .where(User.registered_at >= time_interval, User.telegram_username != None)
-                      .limit(config.PAGE_ENTRIES)
-                      .offset(config.PAGE_ENTRIES * page))
-        users_count_stmt = select(func.count(User.id)).where(User.registered_at >= time_interval)
+        users_stmt = keyset_seek(select(User).where(User.registered_at >= time_interval, User.telegram_username != None),
+                                 User.id, page)
         users = await session_execute(users_stmt, session)
-        users = [UserDTO.model_validate(user, from_attributes=True) for user in users.scalars().all()]
-        users_count = await session_execute(users_count_stmt, session)
-        return users, users_count.scalar_one()
+        users, users_page = keyset_page(users.scalars().all(), page, lambda user: user.id)
+        users = [UserDTO.model_validate(user, from_attributes=True) for user in users]
+        return users, users_page
 
     @staticmethod
-    async def get_max_page_by_timedelta(timedelta: StatisticsTimeDelta, session: Session | AsyncSession) -> int:
-        current_time = datetime.datetime.now()
-        timedelta = datetime.timedelta(days=timedelta.value)
-        time_interval = current_time - timedelta
-        stmt = select(func.count(User.id)).where(User.registered_at >= time_interval,
-                                                 User.telegram_username != None)
-        users = await session_execute(stmt, session)
-        users = users.scalar_one()
-        if users % config.PAGE_ENTRIES == 0:
-            return users / config.PAGE_ENTRIES - 1
-        else:
-            return math.trunc(users / config.PAGE_ENTRIES)
+    async def count_by_timedelta(timedelta: StatisticsTimeDelta, session: Session | AsyncSession) -> int:
+        time_interval = datetime.datetime.now() - datetime.timedelta(days=timedelta.value)
+        stmt = select(func.count(User.id)).where(User.registered_at >= time_interval)
+        users_count = await session_execute(stmt, session)
+        return users_count.scalar_one()
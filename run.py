@@ -1,34 +1,29 @@
+import logging
 import traceback
+
 from aiogram import types, F, Router
 from aiogram.filters import Command
 from aiogram.types import ErrorEvent, Message, BufferedInputFile
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 import config
 from config import SUPPORT_LINK
-import logging
-from bot import dp, main, redis
 from enums.bot_entity import BotEntity
-from middleware.database import DBSessionMiddleware
-from middleware.throttling_middleware import ThrottlingMiddleware
 from models.user import UserDTO
-from multibot import main as main_multibot
-from handlers.user.cart import cart_router
-from handlers.admin.admin import admin_router
-from handlers.user.all_categories import all_categories_router
-from handlers.user.my_profile import my_profile_router
 from services.notification import NotificationService
 from services.user import UserService
 from utils.custom_filters import IsUserExistFilter
 from utils.localizator import Localizator
 
-logging.basicConfig(level=logging.INFO)
-main_router = Router()
+"""
+The bot, the routers and the middlewares are only set up when run.py is started.
+Worker processes started with spawn import this module as __mp_main__ and must not build them again.
+"""
 
 
-@main_router.message(Command(commands=["start", "help"]))
 async def start(message: types.message, session: AsyncSession | Session):
     all_categories_button = types.KeyboardButton(text=Localizator.get_text(BotEntity.USER, "all_categories"))
     my_profile_button = types.KeyboardButton(text=Localizator.get_text(BotEntity.USER, "my_profile"))
@@ -49,12 +44,10 @@ async def start(message: types.message, session: AsyncSession | Session):
     await message.answer(Localizator.get_text(BotEntity.COMMON, "start_message"), reply_markup=start_markup)
 
 
-@main_router.message(F.text == Localizator.get_text(BotEntity.USER, "faq"), IsUserExistFilter())
 async def faq(message: types.message):
     await message.answer(Localizator.get_text(BotEntity.USER, "faq_string"))
 
 
-@main_router.message(F.text == Localizator.get_text(BotEntity.USER, "help"), IsUserExistFilter())
 async def support(message: types.message):
     admin_keyboard_builder = InlineKeyboardBuilder()
 
@@ -63,7 +56,6 @@ async def support(message: types.message):
                          reply_markup=admin_keyboard_builder.as_markup())
 
 
-@main_router.error(F.update.message.as_("message"))
 async def error_handler(event: ErrorEvent, message: Message):
     await message.answer("Oops, something went wrong!")
     traceback_str = traceback.format_exc()
@@ -77,21 +69,44 @@ async def error_handler(event: ErrorEvent, message: Message):
     await NotificationService.send_to_admins(admin_notification, None)
 
 
-throttling_middleware = ThrottlingMiddleware(redis)
-users_routers = Router()
-users_routers.include_routers(
-    all_categories_router,
-    my_profile_router,
-    cart_router
-)
-users_routers.message.middleware(throttling_middleware)
-users_routers.callback_query.middleware(throttling_middleware)
-main_router.include_router(admin_router)
-main_router.include_routers(users_routers)
-main_router.message.middleware(DBSessionMiddleware())
-main_router.callback_query.middleware(DBSessionMiddleware())
+def create_main_router(redis: Redis | None) -> Router:
+    from handlers.admin.admin import admin_router
+    from handlers.user.all_categories import all_categories_router
+    from handlers.user.cart import cart_router
+    from handlers.user.my_profile import my_profile_router
+    from middleware.callback_answer import CallbackAnswerMiddleware
+    from middleware.database import DBSessionMiddleware
+    from middleware.throttling_middleware import ThrottlingMiddleware
+
+    main_router = Router()
+    main_router.message.register(start, Command(commands=["start", "help"]))
+    main_router.message.register(faq, F.text == Localizator.get_text(BotEntity.USER, "faq"), IsUserExistFilter())
+    main_router.message.register(support, F.text == Localizator.get_text(BotEntity.USER, "help"),
+                                 IsUserExistFilter())
+    main_router.error.register(error_handler, F.update.message.as_("message"))
+    throttling_middleware = ThrottlingMiddleware(redis)
+    users_routers = Router()
+    users_routers.include_routers(
+        all_categories_router,
+        my_profile_router,
+        cart_router
+    )
+    users_routers.message.middleware(throttling_middleware)
+    users_routers.callback_query.middleware(throttling_middleware)
+    main_router.include_router(admin_router)
+    main_router.include_routers(users_routers)
+    main_router.message.middleware(DBSessionMiddleware())
+    main_router.callback_query.middleware(DBSessionMiddleware())
+    main_router.callback_query.outer_middleware(CallbackAnswerMiddleware(config.CALLBACK_ANSWER_BUDGET))
+    return main_router
+
 
 if __name__ == '__main__':
+    from bot import dp, main, redis
+    from multibot import main as main_multibot
+
+    logging.basicConfig(level=logging.INFO)
+    main_router = create_main_router(redis)
     if config.MULTIBOT:
         main_multibot(main_router)
     else:
@@ -1,31 +1,42 @@
 import asyncio
+import datetime
 import logging
 import re
+import tempfile
+from pathlib import Path
 
 from aiogram.exceptions import TelegramForbiddenError
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, Message, FSInputFile
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-import config
 from callbacks import AdminAnnouncementCallback, AnnouncementType, AdminInventoryManagementCallback, EntityType, \
     AddType, UserManagementCallback, UserManagementOperation, StatisticsCallback, StatisticsEntity, StatisticsTimeDelta, \
     WalletCallback
 from crypto_api.CryptoApiWrapper import CryptoApiWrapper
 from db import session_commit
+from enums.analytics_bucket import AnalyticsBucket
+from enums.balance_entry_type import BalanceEntryType
 from enums.bot_entity import BotEntity
 from enums.cryptocurrency import Cryptocurrency
-from handlers.admin.constants import AdminConstants, AdminInventoryManagementStates, UserManagementStates, WalletStates
-from handlers.common.common import add_pagination_buttons
+from enums.export_format import ExportFormat
+from enums.export_table import ExportTable
+from handlers.admin.constants import AdminConstants, AdminInventoryManagementStates, UserManagementStates, WalletStates, \
+    StatisticsStates
+from handlers.common.common import add_pagination_buttons, add_keyset_pagination_buttons
+from models.balanceEntry import BalanceEntryDTO
 from models.withdrawal import WithdrawalDTO
+from repositories.balance import BalanceRepository
 from repositories.buy import BuyRepository
 from repositories.category import CategoryRepository
-from repositories.deposit import DepositRepository
 from repositories.item import ItemRepository
+from repositories.statisticsRollup import StatisticsRollupRepository
 from repositories.subcategory import SubcategoryRepository
 from repositories.user import UserRepository
+from services.analytics import AnalyticsService
+from services.export import ExportService
 from utils.localizator import Localizator
 
 
@@ -45,15 +56,20 @@ class AdminService:
         return Localizator.get_text(BotEntity.ADMIN, "announcements"), kb_builder
 
     @staticmethod
-    async def send_announcement(callback: CallbackQuery, session: AsyncSession | Session):
+    async def send_announcement(callback: CallbackQuery, state: FSMContext, session: AsyncSession | Session):
         unpacked_cb = AdminAnnouncementCallback.unpack(callback.data)
         await callback.message.edit_reply_markup()
+        state_data = await state.get_data()
+        message_ids = state_data.get("announcement_message_ids") or []
+        if callback.message.message_id not in message_ids:
+            message_ids = [callback.message.message_id]
+        await state.update_data(announcement_message_ids=None)
         active_users = await UserRepository.get_active(session)
         all_users_count = await UserRepository.get_all_count(session)
         counter = 0
         for user in active_users:
             try:
-                await callback.message.copy_to(user.telegram_id, reply_markup=None)
+                await callback.bot.copy_messages(user.telegram_id, callback.message.chat.id, message_ids)
                 counter += 1
                 await asyncio.sleep(1.5)
             except TelegramForbiddenError as e:
@@ -192,6 +208,14 @@ class AdminService:
                 await state.set_state(AdminInventoryManagementStates.document)
                 return Localizator.get_text(BotEntity.ADMIN, "add_items_txt_msg"), kb_markup
 
+    @staticmethod
+    def get_add_items_file_queued() -> tuple[str, InlineKeyboardBuilder]:
+        # the inventory menu clears the state, later documents are no longer added
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.ADMIN, "add_items_done"),
+                          callback_data=AdminInventoryManagementCallback.create(0))
+        return Localizator.get_text(BotEntity.ADMIN, "add_items_file_queued"), kb_builder
+
     @staticmethod
     async def get_user_management_menu() -> tuple[str, InlineKeyboardBuilder]:
         kb_builder = InlineKeyboardBuilder()
@@ -250,16 +274,18 @@ class AdminService:
         if user is None:
             return Localizator.get_text(BotEntity.ADMIN, "credit_management_user_not_found")
         elif operation == UserManagementOperation.ADD_BALANCE:
-            user.top_up_amount += float(message.text)
-            await UserRepository.update(user, session)
+            await BalanceRepository.add_entry(BalanceEntryDTO(user_id=user.id,
+                                                              entry_type=BalanceEntryType.ADMIN_TOP_UP,
+                                                              amount=float(message.text)), session)
             await session_commit(session)
             return Localizator.get_text(BotEntity.ADMIN, "credit_management_added_success").format(
                 amount=message.text,
                 telegram_id=user.telegram_id,
                 currency_text=Localizator.get_currency_text())
         else:
-            user.consume_records += float(message.text)
-            await UserRepository.update(user, session)
+            await BalanceRepository.add_entry(BalanceEntryDTO(user_id=user.id,
+                                                              entry_type=BalanceEntryType.ADMIN_DEDUCTION,
+                                                              amount=-float(message.text)), session)
             await session_commit(session)
             return Localizator.get_text(BotEntity.ADMIN, "credit_management_reduced_success").format(
                 amount=message.text,
@@ -271,7 +297,7 @@ class AdminService:
         str, InlineKeyboardBuilder]:
         unpacked_cb = UserManagementCallback.unpack(callback.data)
         kb_builder = InlineKeyboardBuilder()
-        refund_data = await BuyRepository.get_refund_data(unpacked_cb.page, session)
+        refund_data, refund_page = await BuyRepository.get_refund_data(unpacked_cb.page, session)
         for refund_item in refund_data:
             callback = UserManagementCallback.create(
                 unpacked_cb.level + 1,
@@ -292,9 +318,8 @@ class AdminService:
                     currency_sym=Localizator.get_currency_symbol()),
                     callback_data=callback)
         kb_builder.adjust(1)
-        kb_builder = await add_pagination_buttons(kb_builder, unpacked_cb,
-                                                  BuyRepository.get_max_refund_page(session),
-                                                  unpacked_cb.get_back_button(0))
+        kb_builder = await add_keyset_pagination_buttons(kb_builder, unpacked_cb, refund_page,
+                                                         unpacked_cb.get_back_button(0))
         return Localizator.get_text(BotEntity.ADMIN, "refund_menu"), kb_builder
 
     @staticmethod
@@ -331,6 +356,10 @@ class AdminService:
                           callback_data=StatisticsCallback.create(1, StatisticsEntity.BUYS))
         kb_builder.button(text=Localizator.get_text(BotEntity.ADMIN, "deposits_statistics"),
                           callback_data=StatisticsCallback.create(1, StatisticsEntity.DEPOSITS))
+        kb_builder.button(text=Localizator.get_text(BotEntity.ADMIN, "custom_range_statistics"),
+                          callback_data=StatisticsCallback.create(4))
+        kb_builder.button(text=Localizator.get_text(BotEntity.ADMIN, "export_data"),
+                          callback_data=StatisticsCallback.create(5))
         kb_builder.button(text=Localizator.get_text(BotEntity.ADMIN, "get_database_file"),
                           callback_data=StatisticsCallback.create(3))
         kb_builder.adjust(1)
@@ -362,70 +391,123 @@ class AdminService:
         kb_builder = InlineKeyboardBuilder()
         match unpacked_cb.statistics_entity:
             case StatisticsEntity.USERS:
-                users, users_count = await UserRepository.get_by_timedelta(unpacked_cb.timedelta, unpacked_cb.page,
+                users, users_page = await UserRepository.get_by_timedelta(unpacked_cb.timedelta, unpacked_cb.page,
                                                                            session)
                 [kb_builder.button(text=user.telegram_username, url=f't.me/{user.telegram_username}') for user in
                  users
                  if user.telegram_username]
                 kb_builder.adjust(1)
-                kb_builder = await add_pagination_buttons(
-                    kb_builder,
-                    unpacked_cb,
-                    UserRepository.get_max_page_by_timedelta(unpacked_cb.timedelta, session),
-                    None)
+                kb_builder = await add_keyset_pagination_buttons(kb_builder, unpacked_cb, users_page, None)
                 kb_builder.row(AdminConstants.back_to_main_button, unpacked_cb.get_back_button())
+                if unpacked_cb.page != 0:
+                    # the total is shown on the first page only, paging doesn't count the users again
+                    return Localizator.get_text(BotEntity.ADMIN, "new_users_page_msg").format(
+                        timedelta=unpacked_cb.timedelta.value
+                    ), kb_builder
+                users_count = await UserRepository.count_by_timedelta(unpacked_cb.timedelta, session)
                 return Localizator.get_text(BotEntity.ADMIN, "new_users_msg").format(
                     users_count=users_count,
                     timedelta=unpacked_cb.timedelta.value
                 ), kb_builder
             case StatisticsEntity.BUYS:
-                buys = await BuyRepository.get_by_timedelta(unpacked_cb.timedelta, session)
-                total_profit = 0.0
-                items_sold = 0
-                for buy in buys:
-                    total_profit += buy.total_price
-                    items_sold += buy.quantity
+                sales = await StatisticsRollupRepository.get_sales(unpacked_cb.timedelta, session)
                 kb_builder.row(AdminConstants.back_to_main_button, unpacked_cb.get_back_button())
                 return Localizator.get_text(BotEntity.ADMIN, "sales_statistics").format(
                     timedelta=unpacked_cb.timedelta,
-                    total_profit=total_profit, items_sold=items_sold,
-                    buys_count=len(buys), currency_sym=Localizator.get_currency_symbol()), kb_builder
+                    total_profit=sales.revenue, items_sold=sales.items_sold,
+                    buys_count=sales.buys_count, currency_sym=Localizator.get_currency_symbol()), kb_builder
             case StatisticsEntity.DEPOSITS:
-                deposits = await DepositRepository.get_by_timedelta(unpacked_cb.timedelta, session)
-                fiat_amount = 0.0
-                btc_amount = 0.0
-                ltc_amount = 0.0
-                sol_amount = 0.0
-                eth_amount = 0.0
-                bnb_amount = 0.0
-                for deposit in deposits:
-                    match deposit.network:
-                        case "BTC":
-                            btc_amount += deposit.amount / pow(10, deposit.network.get_divider())
-                        case "LTC":
-                            ltc_amount += deposit.amount / pow(10, deposit.network.get_divider())
-                        case "SOL":
-                            sol_amount += deposit.amount / pow(10, deposit.network.get_divider())
-                        case "ETH":
-                            eth_amount += deposit.amount / pow(10, deposit.network.get_divider())
-                        case "BNB":
-                            bnb_amount += deposit.amount / pow(10, deposit.network.get_divider())
-                prices = await CryptoApiWrapper.get_crypto_prices()
-                btc_price = prices[Cryptocurrency.BTC.get_coingecko_name()][config.CURRENCY.value.lower()]
-                ltc_price = prices[Cryptocurrency.LTC.get_coingecko_name()][config.CURRENCY.value.lower()]
-                sol_price = prices[Cryptocurrency.SOL.get_coingecko_name()][config.CURRENCY.value.lower()]
-                eth_price = prices[Cryptocurrency.ETH.get_coingecko_name()][config.CURRENCY.value.lower()]
-                bnb_price = prices[Cryptocurrency.BNB.get_coingecko_name()][config.CURRENCY.value.lower()]
-                fiat_amount += ((btc_amount * btc_price) + (ltc_amount * ltc_price) + (sol_amount * sol_price)
-                                + (eth_amount * eth_price) + (bnb_amount * bnb_price))
+                # one row per network, so the conversion below doesn't depend on the number of deposits
+                deposits = await StatisticsRollupRepository.get_deposits(unpacked_cb.timedelta, session)
+                crypto_amounts = {network: 0.0 for network in Cryptocurrency}
+                crypto_amounts.update({deposit.network: deposit.amount / pow(10, deposit.network.get_divider())
+                                       for deposit in deposits})
+                deposits_count = sum(deposit.deposits_count for deposit in deposits)
+                prices = await CryptoApiWrapper.get_fiat_prices()
+                fiat_amount = sum(crypto_amount * prices[network] for network, crypto_amount in crypto_amounts.items())
                 kb_builder.row(AdminConstants.back_to_main_button, unpacked_cb.get_back_button())
                 return Localizator.get_text(BotEntity.ADMIN, "deposits_statistics_msg").format(
-                    timedelta=unpacked_cb.timedelta, deposits_count=len(deposits),
-                    btc_amount=btc_amount, ltc_amount=ltc_amount,
-                    sol_amount=sol_amount, eth_amount=eth_amount,
-                    bnb_amount=bnb_amount,
+                    timedelta=unpacked_cb.timedelta, deposits_count=deposits_count,
+                    btc_amount=crypto_amounts[Cryptocurrency.BTC], ltc_amount=crypto_amounts[Cryptocurrency.LTC],
+                    sol_amount=crypto_amounts[Cryptocurrency.SOL], eth_amount=crypto_amounts[Cryptocurrency.ETH],
+                    bnb_amount=crypto_amounts[Cryptocurrency.BNB],
                     fiat_amount=fiat_amount, currency_text=Localizator.get_currency_text()), kb_builder
 
+    @staticmethod
+    async def request_analytics_range(state: FSMContext) -> tuple[str, InlineKeyboardBuilder]:
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "cancel"),
+                          callback_data=StatisticsCallback.create(0))
+        await state.set_state(StatisticsStates.analytics_range)
+        return Localizator.get_text(BotEntity.ADMIN, "analytics_range_request"), kb_builder
+
+    @staticmethod
+    async def get_analytics(message: Message, state: FSMContext,
+                            session: AsyncSession | Session) -> tuple[str, InlineKeyboardBuilder]:
+        # "<from> <to> <hour|day|week>", from and to in ISO format, to is exclusive
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "cancel"),
+                          callback_data=StatisticsCallback.create(0))
+        try:
+            time_from, time_to, bucket = message.text.split()
+            time_from = datetime.datetime.fromisoformat(time_from)
+            time_to = datetime.datetime.fromisoformat(time_to)
+            bucket = AnalyticsBucket(bucket.lower())
+        except ValueError:
+            return Localizator.get_text(BotEntity.ADMIN, "analytics_range_invalid"), kb_builder
+        if time_from >= time_to:
+            return Localizator.get_text(BotEntity.ADMIN, "analytics_range_invalid"), kb_builder
+        time_from, time_to = AnalyticsService.snap_range(time_from, time_to, bucket)
+        if len(AnalyticsService.get_bucket_starts(time_from, time_to, bucket)) > AnalyticsService.max_buckets:
+            return Localizator.get_text(BotEntity.ADMIN, "analytics_too_many_buckets").format(
+                max_buckets=AnalyticsService.max_buckets), kb_builder
+        await state.clear()
+        msg = await AnalyticsService.get_table(time_from, time_to, bucket, session)
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "back_button"),
+                          callback_data=StatisticsCallback.create(0))
+        kb_builder.row(AdminConstants.back_to_main_button)
+        return msg, kb_builder
+
+    @staticmethod
+    async def request_export(state: FSMContext) -> tuple[str, InlineKeyboardBuilder]:
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "cancel"),
+                          callback_data=StatisticsCallback.create(0))
+        await state.set_state(StatisticsStates.export_request)
+        return Localizator.get_text(BotEntity.ADMIN, "export_request").format(
+            tables=", ".join(export_table.value for export_table in ExportTable)), kb_builder
+
+    @staticmethod
+    async def send_export(message: Message, state: FSMContext,
+                          session: AsyncSession | Session) -> tuple[str, InlineKeyboardBuilder]:
+        # "<table> <csv|jsonl> [from] [to]", from and to in ISO format, to is exclusive
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "cancel"),
+                          callback_data=StatisticsCallback.create(0))
+        try:
+            export_table, export_format, *time_range = message.text.split()
+            export_table = ExportTable(export_table.lower())
+            export_format = ExportFormat(export_format.lower())
+            time_range = [datetime.datetime.fromisoformat(time) for time in time_range]
+        except ValueError:
+            return Localizator.get_text(BotEntity.ADMIN, "export_request_invalid"), kb_builder
+        if len(time_range) > 2:
+            return Localizator.get_text(BotEntity.ADMIN, "export_request_invalid"), kb_builder
+        time_from, time_to = time_range + [None] * (2 - len(time_range))
+        await state.clear()
+        filename = f"{export_table.value}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format.value}.gz"
+        # the file is written to disk and uploaded from there, never held in memory as a whole
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / filename
+            rows_count = await ExportService.export(export_table, export_format, time_from, time_to, path, session)
+            await message.answer_document(FSInputFile(path, filename=filename))
+        kb_builder = InlineKeyboardBuilder()
+        kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "back_button"),
+                          callback_data=StatisticsCallback.create(0))
+        kb_builder.row(AdminConstants.back_to_main_button)
+        return Localizator.get_text(BotEntity.ADMIN, "export_done").format(rows_count=rows_count), kb_builder
+
     @staticmethod
     async def get_wallet_menu() -> tuple[str, InlineKeyboardBuilder]:
         kb_builder = InlineKeyboardBuilder()
@@ -475,8 +557,8 @@ class AdminService:
         state_data = await state.get_data()
         await state.update_data(to_address=to_address)
         cryptocurrency = Cryptocurrency(state_data['cryptocurrency'])
-        prices = await CryptoApiWrapper.get_crypto_prices()
-        price = prices[cryptocurrency.get_coingecko_name()][config.CURRENCY.value.lower()]
+        prices = await CryptoApiWrapper.get_fiat_prices()
+        price = prices[cryptocurrency]
 
         withdraw_dto = await CryptoApiWrapper.withdrawal(
             cryptocurrency,
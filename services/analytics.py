@@ -0,0 +1,62 @@
+import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from crypto_api.CryptoApiWrapper import CryptoApiWrapper
+from enums.analytics_bucket import AnalyticsBucket
+from enums.bot_entity import BotEntity
+from repositories.analytics import AnalyticsRepository
+from utils.localizator import Localizator
+
+
+class AnalyticsService:
+    # one table line per bucket, the whole table has to fit into a single message
+    max_buckets = 60
+
+    @staticmethod
+    def snap_range(time_from: datetime.datetime, time_to: datetime.datetime,
+                   bucket: AnalyticsBucket) -> tuple[datetime.datetime, datetime.datetime]:
+        # rollups only hold whole hours and days, so the range is widened to whole buckets
+        # and every series of the table covers the same window
+        return bucket.get_start(time_from), bucket.get_end(time_to)
+
+    @staticmethod
+    def get_bucket_starts(time_from: datetime.datetime, time_to: datetime.datetime,
+                          bucket: AnalyticsBucket) -> list[datetime.datetime]:
+        bucket_starts = []
+        bucket_start = bucket.get_start(time_from)
+        while bucket_start < time_to and len(bucket_starts) <= AnalyticsService.max_buckets:
+            bucket_starts.append(bucket_start)
+            bucket_start += bucket.get_timedelta()
+        return bucket_starts
+
+    @staticmethod
+    async def get_table(time_from: datetime.datetime, time_to: datetime.datetime, bucket: AnalyticsBucket,
+                        session: AsyncSession | Session) -> str:
+        bucket_starts = AnalyticsService.get_bucket_starts(time_from, time_to, bucket)
+        sales = await AnalyticsRepository.get_sales(time_from, time_to, bucket, session)
+        new_users = await AnalyticsRepository.get_new_users(time_from, time_to, bucket, session)
+        deposits = await AnalyticsRepository.get_deposits(time_from, time_to, bucket, session)
+        prices = await CryptoApiWrapper.get_fiat_prices() if len(deposits) > 0 else {}
+        rows = []
+        for bucket_start in bucket_starts:
+            bucket_key = AnalyticsRepository.format_bucket_start(bucket_start, bucket)
+            revenue, buys_count = sales.get(bucket_key, (0.0, 0))
+            deposits_fiat = sum(amount / pow(10, network.get_divider()) * prices[network]
+                                for network, amount in deposits.get(bucket_key, {}).items())
+            rows.append((bucket_key, revenue, buys_count, new_users.get(bucket_key, 0), deposits_fiat))
+        totals = (Localizator.get_text(BotEntity.ADMIN, "analytics_total"),
+                  sum(row[1] for row in rows), sum(row[2] for row in rows),
+                  sum(row[3] for row in rows), sum(row[4] for row in rows))
+        label_width = max(len(row[0]) for row in rows + [totals])
+        columns = Localizator.get_text(BotEntity.ADMIN, "analytics_columns").split(",")
+        lines = [f"{columns[0]:<{label_width}} {columns[1]:>9} {columns[2]:>5} {columns[3]:>5} {columns[4]:>9}"]
+        for label, revenue, buys_count, users_count, deposits_fiat in rows + [totals]:
+            lines.append(f"{label:<{label_width}} {revenue:>9.2f} {buys_count:>5} {users_count:>5} "
+                         f"{deposits_fiat:>9.2f}")
+        return Localizator.get_text(BotEntity.ADMIN, "analytics_header").format(
+            time_from=time_from.strftime("%Y-%m-%d %H:%M"),
+            time_to=time_to.strftime("%Y-%m-%d %H:%M"),
+            bucket=bucket.value,
+            currency_text=Localizator.get_currency_text()) + "\n<pre>" + "\n".join(lines) + "</pre>"
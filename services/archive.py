@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+import logging
+
+import config
+from db import get_db_session, session_commit
+from repositories.archive import ArchiveRepository
+
+
+class ArchiveService:
+    # items moved per transaction, so archiving never holds the write lock for long
+    batch_size = 1000
+    # seconds between two archive runs
+    interval = 60 * 60
+    __task: asyncio.Task | None = None
+
+    @staticmethod
+    def start():
+        if config.ARCHIVE_SOLD_ITEMS_AFTER_DAYS > 0 and ArchiveService.__task is None:
+            ArchiveService.__task = asyncio.create_task(ArchiveService.__run())
+
+    @staticmethod
+    async def archive_sold_items() -> int:
+        sold_before = datetime.datetime.now() - datetime.timedelta(days=config.ARCHIVE_SOLD_ITEMS_AFTER_DAYS)
+        archived_count = 0
+        async with get_db_session() as session:
+            while True:
+                item_ids = await ArchiveRepository.get_archivable_item_ids(sold_before, ArchiveService.batch_size,
+                                                                           session)
+                if len(item_ids) == 0:
+                    return archived_count
+                await ArchiveRepository.archive_items(item_ids, session)
+                await session_commit(session)
+                archived_count += len(item_ids)
+                await asyncio.sleep(0)
+
+    @staticmethod
+    async def __run():
+        while True:
+            try:
+                archived_count = await ArchiveService.archive_sold_items()
+                if archived_count > 0:
+                    logging.info(f"Archived {archived_count} sold items")
+            except Exception:
+                logging.exception("Archiving sold items failed")
+            await asyncio.sleep(ArchiveService.interval)
@@ -5,11 +5,14 @@ from sqlalchemy.orm import Session
 
 from callbacks import MyProfileCallback
 from db import session_commit
+from enums.balance_entry_type import BalanceEntryType
 from enums.bot_entity import BotEntity
+from models.balanceEntry import BalanceEntryDTO
 from models.buy import BuyDTO
+from repositories.balance import BalanceRepository
 from repositories.buy import BuyRepository
 from repositories.item import ItemRepository
-from repositories.user import UserRepository
+from repositories.statisticsRollup import StatisticsRollupRepository
 from services.message import MessageService
 from services.notification import NotificationService
 from utils.localizator import Localizator
@@ -23,11 +26,13 @@ class BuyService:
         buy = await BuyRepository.get_by_id(buy_dto.id, session)
         buy.is_refunded = True
         await BuyRepository.update(buy, session)
-        user = await UserRepository.get_by_tgid(refund_data.telegram_id, session)
-        user.consume_records = user.consume_records - refund_data.total_price
-        await UserRepository.update(user, session)
+        await StatisticsRollupRepository.add_buy(buy.id, session, sign=-1)
+        await BalanceRepository.add_entry(BalanceEntryDTO(user_id=buy.buyer_id,
+                                                          entry_type=BalanceEntryType.REFUND,
+                                                          amount=refund_data.total_price,
+                                                          reference_id=buy.id), session)
+        await NotificationService.refund(refund_data, session)
         await session_commit(session)
-        await NotificationService.refund(refund_data)
         if refund_data.telegram_username:
             return Localizator.get_text(BotEntity.ADMIN, "successfully_refunded_with_username").format(
                 total_price=refund_data.total_price,
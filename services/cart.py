@@ -4,18 +4,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from callbacks import AllCategoriesCallback, CartCallback
-from db import session_commit
+from db import session_commit, session_rollback
+from enums.balance_entry_type import BalanceEntryType
 from enums.bot_entity import BotEntity
 from handlers.common.common import add_pagination_buttons
+from models.balanceEntry import BalanceEntryDTO
 from models.buy import BuyDTO
 from models.buyItem import BuyItemDTO
-from models.cartItem import CartItemDTO
+from models.cartItem import CartItemDTO, CheckoutPlanDTO
 from models.item import ItemDTO
+from repositories.balance import BalanceRepository
 from repositories.buy import BuyRepository
 from repositories.buyItem import BuyItemRepository
 from repositories.cart import CartRepository
 from repositories.cartItem import CartItemRepository
 from repositories.item import ItemRepository
+from repositories.statisticsRollup import StatisticsRollupRepository
 from repositories.subcategory import SubcategoryRepository
 from repositories.user import UserRepository
 from services.message import MessageService
@@ -86,32 +90,24 @@ class CartService:
             return Localizator.get_text(BotEntity.USER, "delete_cart_item_confirmation"), kb_builder
 
     @staticmethod
-    async def __create_checkout_msg(cart_items: list[CartItemDTO], session: AsyncSession | Session) -> str:
+    async def __create_checkout_msg(checkout_plan: CheckoutPlanDTO) -> str:
         message_text = Localizator.get_text(BotEntity.USER, "cart_confirm_checkout_process")
         message_text += "<b>\n\n"
-        cart_grand_total = 0.0
-
-        for cart_item in cart_items:
-            item_dto = ItemDTO(category_id=cart_item.category_id, subcategory_id=cart_item.subcategory_id)
-            price = await ItemRepository.get_price(item_dto, session)
-            subcategory = await SubcategoryRepository.get_by_id(cart_item.subcategory_id, session)
-            line_item_total = price * cart_item.quantity
-            cart_line_item = Localizator.get_text(BotEntity.USER, "cart_item_button").format(
-                subcategory_name=subcategory.name, qty=cart_item.quantity,
-                total_price=line_item_total, currency_sym=Localizator.get_currency_symbol()
+        for line in checkout_plan.lines:
+            message_text += Localizator.get_text(BotEntity.USER, "cart_item_button").format(
+                subcategory_name=line.subcategory_name, qty=line.quantity,
+                total_price=line.total_price, currency_sym=Localizator.get_currency_symbol()
             )
-            cart_grand_total += line_item_total
-            message_text += cart_line_item
         message_text += Localizator.get_text(BotEntity.USER, "cart_grand_total_string").format(
-            cart_grand_total=cart_grand_total, currency_sym=Localizator.get_currency_symbol())
+            cart_grand_total=checkout_plan.grand_total, currency_sym=Localizator.get_currency_symbol())
         message_text += "</b>"
         return message_text
 
     @staticmethod
     async def checkout_processing(callback: CallbackQuery, session: AsyncSession | Session) -> tuple[str, InlineKeyboardBuilder]:
         user = await UserRepository.get_by_tgid(callback.from_user.id, session)
-        cart_items = await CartItemRepository.get_all_by_user_id(user.id, session)
-        message_text = await CartService.__create_checkout_msg(cart_items, session)
+        checkout_plan = await CartItemRepository.get_checkout_plan(user.id, session)
+        message_text = await CartService.__create_checkout_msg(checkout_plan)
         kb_builder = InlineKeyboardBuilder()
         kb_builder.button(text=Localizator.get_text(BotEntity.COMMON, "confirm"),
                           callback_data=CartCallback.create(3,
@@ -124,40 +120,45 @@ class CartService:
     async def buy_processing(callback: CallbackQuery, session: AsyncSession | Session) -> tuple[str, InlineKeyboardBuilder]:
         unpacked_cb = CartCallback.unpack(callback.data)
         user = await UserRepository.get_by_tgid(callback.from_user.id, session)
-        cart_items = await CartItemRepository.get_all_by_user_id(user.id, session)
-        cart_total = 0.0
-        out_of_stock = []
-        for cart_item in cart_items:
-            item_dto = ItemDTO(category_id=cart_item.category_id, subcategory_id=cart_item.subcategory_id)
-            price = await ItemRepository.get_price(item_dto, session)
-            cart_total += price * cart_item.quantity
-            is_in_stock = await ItemRepository.get_available_qty(item_dto, session) >= cart_item.quantity
-            if is_in_stock is False:
-                out_of_stock.append(cart_item)
-        is_enough_money = (user.top_up_amount - user.consume_records) >= cart_total
+        checkout_plan = await CartItemRepository.get_checkout_plan(user.id, session)
+        out_of_stock = checkout_plan.out_of_stock
+        is_enough_money = (user.top_up_amount - user.consume_records) >= checkout_plan.grand_total
         kb_builder = InlineKeyboardBuilder()
         if unpacked_cb.confirmation and len(out_of_stock) == 0 and is_enough_money:
+            purchased_items = await ItemRepository.get_purchased_items_by_cart(user.id, session)
             sold_items = []
+            buy_item_dto_list = []
+            items_to_update = []
             msg = ""
-            for cart_item in cart_items:
-                price = await ItemRepository.get_price(ItemDTO(category_id=cart_item.category_id,
-                                                               subcategory_id=cart_item.subcategory_id), session)
-                purchased_items = await ItemRepository.get_purchased_items(cart_item.category_id,
-                                                                           cart_item.subcategory_id, cart_item.quantity, session)
-                buy_dto = BuyDTO(buyer_id=user.id, quantity=cart_item.quantity, total_price=cart_item.quantity * price)
+            for line in checkout_plan.lines:
+                line_items = purchased_items.get(line.cart_item_id, [])
+                buy_dto = BuyDTO(buyer_id=user.id, subcategory_id=line.subcategory_id, quantity=line.quantity,
+                                 total_price=line.total_price)
                 buy_id = await BuyRepository.create(buy_dto, session)
-                buy_item_dto_list = [BuyItemDTO(item_id=item.id, buy_id=buy_id) for item in purchased_items]
-                await BuyItemRepository.create_many(buy_item_dto_list, session)
-                for item in purchased_items:
+                await StatisticsRollupRepository.add_buy(buy_id, session)
+                is_paid = await BalanceRepository.add_entry(BalanceEntryDTO(user_id=user.id,
+                                                                            entry_type=BalanceEntryType.PURCHASE,
+                                                                            amount=-line.total_price,
+                                                                            reference_id=buy_id), session,
+                                                            require_funds=True)
+                if is_paid is False:
+                    # the balance was spent by a concurrent checkout or deduction since it was read above
+                    await session_rollback(session)
+                    kb_builder.row(unpacked_cb.get_back_button(0))
+                    return Localizator.get_text(BotEntity.USER, "insufficient_funds"), kb_builder
+                buy_item_dto_list += [BuyItemDTO(item_id=item.id, buy_id=buy_id) for item in line_items]
+                for item in line_items:
                     item.is_sold = True
-                await ItemRepository.update(purchased_items, session)
-                await CartItemRepository.remove_from_cart(cart_item.id, session)
-                sold_items.append(cart_item)
-                msg += MessageService.create_message_with_bought_items(purchased_items)
-            user.consume_records = user.consume_records + cart_total
-            await UserRepository.update(user, session)
-            await session_commit(session)
+                items_to_update += line_items
+                sold_items.append(CartItemDTO(id=line.cart_item_id, category_id=line.category_id,
+                                              subcategory_id=line.subcategory_id, quantity=line.quantity))
+                msg += MessageService.create_message_with_bought_items(line_items)
+            await BuyItemRepository.create_many(buy_item_dto_list, session)
+            await ItemRepository.update(items_to_update, session)
+            await CartItemRepository.remove_many_from_cart([line.cart_item_id for line in checkout_plan.lines],
+                                                           session)
             await NotificationService.new_buy(sold_items, user, session)
+            await session_commit(session)
             return msg, kb_builder
         elif unpacked_cb.confirmation is False:
             kb_builder.row(unpacked_cb.get_back_button(0))
@@ -168,7 +169,6 @@ class CartService:
         elif len(out_of_stock) > 0:
             kb_builder.row(unpacked_cb.get_back_button(0))
             msg = Localizator.get_text(BotEntity.USER, "out_of_stock")
-            for item in out_of_stock:
-                subcategory = await SubcategoryRepository.get_by_id(item.subcategory_id, session)
-                msg += subcategory.name + "\n"
+            for line in out_of_stock:
+                msg += line.subcategory_name + "\n"
             return msg, kb_builder
@@ -0,0 +1,52 @@
+import asyncio
+import csv
+import datetime
+import gzip
+import json
+from contextlib import aclosing
+from enum import Enum
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from enums.export_format import ExportFormat
+from enums.export_table import ExportTable
+from repositories.export import ExportRepository
+
+
+class ExportService:
+    # rows fetched and written per step, so memory use doesn't depend on the size of the table
+    partition_size = 1000
+
+    @staticmethod
+    def __format_value(value):
+        if isinstance(value, datetime.datetime):
+            return value.isoformat(sep=" ")
+        if isinstance(value, Enum):
+            return value.value
+        return value
+
+    @staticmethod
+    async def export(export_table: ExportTable, export_format: ExportFormat, time_from: datetime.datetime | None,
+                     time_to: datetime.datetime | None, path: Path, session: AsyncSession | Session) -> int:
+        columns = [column.name for column in ExportRepository.get_columns(export_table)]
+        rows_count = 0
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            if export_format == ExportFormat.CSV:
+                writer.writerow(columns)
+            partitions = ExportRepository.stream(export_table, time_from, time_to, ExportService.partition_size,
+                                                 session)
+            async with aclosing(partitions):
+                async for partition in partitions:
+                    rows = [[ExportService.__format_value(value) for value in row] for row in partition]
+                    # compression runs off the event loop
+                    if export_format == ExportFormat.CSV:
+                        await asyncio.to_thread(writer.writerows, rows)
+                    else:
+                        lines = "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+                                        for row in rows)
+                        await asyncio.to_thread(file.write, lines)
+                    rows_count += len(rows)
+        return rows_count
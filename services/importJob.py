@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from tempfile import SpooledTemporaryFile
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from callbacks import AddType
+from db import session_commit, session_rollback, get_db_session
+from enums.bot_entity import BotEntity
+from enums.import_job_status import ImportJobStatus
+from models.importJob import ImportJobDTO
+from models.importJobFile import ImportJobFileDTO
+from repositories.importJob import ImportJobRepository
+from services.item import ItemService
+from utils.items_parser import ImportCursor
+from utils.localizator import Localizator
+
+
+class ImportJobService:
+    # one runner task per job in this process, a wakeup tells a running runner that a file was appended
+    __runners: dict[int, asyncio.Task] = {}
+    __wakeups: set[int] = set()
+
+    @staticmethod
+    async def add_file(import_job_id: int | None, message: Message, add_type: AddType,
+                       session: AsyncSession | Session) -> int:
+        import_job = None
+        if import_job_id is not None:
+            import_job = await ImportJobRepository.get_by_id(import_job_id, session)
+        if import_job is None or import_job.status != ImportJobStatus.RUNNING:
+            status_message = await message.answer(
+                text=Localizator.get_text(BotEntity.ADMIN, "add_items_progress").format(adding_result=0,
+                                                                                       file_number=1,
+                                                                                       files_count=1))
+            import_job_id = await ImportJobRepository.create(ImportJobDTO(chat_id=message.chat.id,
+                                                                          status_message_id=status_message.message_id,
+                                                                          add_type=add_type.value), session)
+        await ImportJobRepository.add_file(ImportJobFileDTO(job_id=import_job_id,
+                                                            file_id=message.document.file_id), session)
+        await session_commit(session)
+        ImportJobService.start(import_job_id, message.bot)
+        return import_job_id
+
+    @staticmethod
+    def start(import_job_id: int, bot: Bot):
+        ImportJobService.__wakeups.add(import_job_id)
+        runner = ImportJobService.__runners.get(import_job_id)
+        if runner is None or runner.done():
+            ImportJobService.__runners[import_job_id] = asyncio.create_task(ImportJobService.__run(import_job_id, bot))
+
+    @staticmethod
+    async def resume(bot: Bot):
+        # jobs interrupted by a restart continue from the checkpoint of their last committed batch
+        async with get_db_session() as session:
+            import_jobs = await ImportJobRepository.get_running(session)
+        for import_job in import_jobs:
+            ImportJobService.start(import_job.id, bot)
+
+    @staticmethod
+    async def __edit_status(bot: Bot, import_job: ImportJobDTO, text: str):
+        try:
+            await bot.edit_message_text(text=text, chat_id=import_job.chat_id,
+                                        message_id=import_job.status_message_id)
+        except TelegramBadRequest as e:
+            logging.warning(e.message)
+
+    @staticmethod
+    async def __import_file(bot: Bot, import_job: ImportJobDTO, import_job_file: ImportJobFileDTO,
+                            session: AsyncSession | Session):
+        last_progress_edit = time.monotonic()
+        cursor = ImportCursor(import_job_file.cursor_offset, import_job_file.cursor_number)
+        # files up to 8 MB stay in memory, larger ones spill to an anonymous temp file
+        with SpooledTemporaryFile(max_size=8 * 1024 * 1024) as file:
+            await bot.download(import_job_file.file_id, destination=file)
+            batches = ItemService.add_items(file, AddType(import_job.add_type), cursor, session)
+            async with aclosing(batches):
+                async for cursor, added_count, skipped_count in batches:
+                    await ImportJobRepository.checkpoint(import_job_file, cursor, added_count, skipped_count, session)
+                    await session_commit(session)
+                    import_job.added_count += added_count
+                    import_job.skipped_count += skipped_count
+                    # Telegram rate-limits message edits, so progress is refreshed at most once per second
+                    if time.monotonic() - last_progress_edit >= 1:
+                        last_progress_edit = time.monotonic()
+                        done_files, files_count = await ImportJobRepository.get_files_progress(import_job.id,
+                                                                                              session)
+                        await ImportJobService.__edit_status(bot, import_job, Localizator.get_text(
+                            BotEntity.ADMIN, "add_items_progress").format(adding_result=import_job.added_count,
+                                                                          file_number=done_files + 1,
+                                                                          files_count=files_count))
+
+    @staticmethod
+    async def __run(import_job_id: int, bot: Bot):
+        async with get_db_session() as session:
+            import_job = await ImportJobRepository.get_by_id(import_job_id, session)
+            try:
+                while True:
+                    ImportJobService.__wakeups.discard(import_job_id)
+                    import_job_file = await ImportJobRepository.get_next_file(import_job_id, session)
+                    if import_job_file is not None:
+                        await ImportJobService.__import_file(bot, import_job, import_job_file, session)
+                        continue
+                    if import_job_id in ImportJobService.__wakeups:
+                        continue
+                    await ImportJobRepository.update_status(import_job_id, ImportJobStatus.DONE, None, session)
+                    await session_commit(session)
+                    if import_job_id not in ImportJobService.__wakeups:
+                        break
+                    await ImportJobRepository.update_status(import_job_id, ImportJobStatus.RUNNING, None, session)
+                    await session_commit(session)
+                msg = Localizator.get_text(BotEntity.ADMIN, "add_items_success").format(
+                    adding_result=import_job.added_count)
+                if import_job.skipped_count > 0:
+                    msg += "\n" + Localizator.get_text(BotEntity.ADMIN, "add_items_duplicates_skipped").format(
+                        skipped_count=import_job.skipped_count)
+            except Exception as e:
+                logging.exception(f"Import job {import_job_id} failed")
+                await session_rollback(session)
+                await ImportJobRepository.update_status(import_job_id, ImportJobStatus.FAILED, str(e), session)
+                await session_commit(session)
+                if import_job.added_count > 0:
+                    msg = Localizator.get_text(BotEntity.ADMIN, "add_items_partial_err").format(
+                        adding_result=import_job.added_count, exception=e)
+                else:
+                    msg = Localizator.get_text(BotEntity.ADMIN, "add_items_err").format(adding_result=e)
+            finally:
+                ImportJobService.__runners.pop(import_job_id, None)
+            await ImportJobService.__edit_status(bot, import_job, msg)
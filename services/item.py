@@ -1,76 +1,110 @@
-from json import load
-from pathlib import Path
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, AsyncIterator
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+import config
 from callbacks import AddType
-from db import session_commit
-from enums.bot_entity import BotEntity
-from models.item import ItemDTO
+from models.item import ItemStockDTO, private_data_hash
 from repositories.category import CategoryRepository
 from repositories.item import ItemRepository
 from repositories.subcategory import SubcategoryRepository
-from utils.localizator import Localizator
+from utils.items_parser import ItemsParser, ItemRow, ImportCursor
 
 
 class ItemService:
+    __parsing_pool: ProcessPoolExecutor | None = None
 
     @staticmethod
-    async def get_new(session: AsyncSession | Session) -> list[ItemDTO]:
-        return await ItemRepository.get_new(session)
+    async def get_new_stock(session: AsyncSession | Session) -> list[ItemStockDTO]:
+        return await ItemRepository.get_stock(True, session)
 
     @staticmethod
-    async def get_in_stock_items(session: AsyncSession | Session):
-        return await ItemRepository.get_in_stock(session)
+    async def get_in_stock(session: AsyncSession | Session) -> list[ItemStockDTO]:
+        return await ItemRepository.get_stock(False, session)
 
     @staticmethod
-    async def parse_items_json(path_to_file: str, session: AsyncSession | Session):
-        with open(path_to_file, 'r', encoding='utf-8') as file:
-            items = load(file)
-            items_list = []
-            for item in items:
-                category = await CategoryRepository.get_or_create(item['category'], session)
-                subcategory = await SubcategoryRepository.get_or_create(item['subcategory'], session)
-                item.pop('category')
-                item.pop('subcategory')
-                items_list.append(ItemDTO(
-                    category_id=category.id,
-                    subcategory_id=subcategory.id,
-                    **item
-                ))
-            return items_list
+    async def __add_batch(batch: list[ItemRow], category_ids: dict[str, int], subcategory_ids: dict[str, int],
+                          session: AsyncSession | Session) -> int:
+        # returns the number of added items, duplicates within the batch or of unsold stock are skipped
+        rows_by_hash = {}
+        for row in batch:
+            rows_by_hash.setdefault(private_data_hash(row[4]), row)
+        unsold_hashes = await ItemRepository.get_unsold_hashes(list(rows_by_hash.keys()), session)
+        new_rows = {row_hash: row for row_hash, row in rows_by_hash.items() if row_hash not in unsold_hashes}
+        if len(new_rows) == 0:
+            return 0
+        new_category_names = {row[0] for row in new_rows.values()} - category_ids.keys()
+        if len(new_category_names) > 0:
+            category_ids.update(await CategoryRepository.get_or_create_many(new_category_names, session))
+        new_subcategory_names = {row[1] for row in new_rows.values()} - subcategory_ids.keys()
+        if len(new_subcategory_names) > 0:
+            subcategory_ids.update(await SubcategoryRepository.get_or_create_many(new_subcategory_names, session))
+        return await ItemRepository.add_many([{"category_id": category_ids[category_name],
+                                               "subcategory_id": subcategory_ids[subcategory_name],
+                                               "description": description,
+                                               "price": price,
+                                               "private_data": private_data,
+                                               "private_data_hash": row_hash}
+                                              for row_hash, (category_name, subcategory_name, description, price,
+                                                             private_data) in new_rows.items()],
+                                             session)
 
     @staticmethod
-    async def parse_items_txt(path_to_file: str, session: AsyncSession | Session):
-        with open(path_to_file, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-            items_list = []
-            for line in lines:
-                category_name, subcategory_name, description, price, private_data = line.split(';')
-                category = await CategoryRepository.get_or_create(category_name, session)
-                subcategory = await SubcategoryRepository.get_or_create(subcategory_name, session)
-                items_list.append(ItemDTO(
-                    category_id=category.id,
-                    subcategory_id=subcategory.id,
-                    price=float(price),
-                    description=description,
-                    private_data=private_data
-                ))
-            return items_list
+    def __get_parsing_pool() -> ProcessPoolExecutor:
+        if ItemService.__parsing_pool is None:
+            # spawned workers don't inherit the event loop, db connections and aiosqlite threads.
+            # They import run.py as __mp_main__, which sets up the bot only when it is started itself
+            ItemService.__parsing_pool = ProcessPoolExecutor(max_workers=config.IMPORT_PARSER_PROCESSES,
+                                                             mp_context=multiprocessing.get_context("spawn"))
+        return ItemService.__parsing_pool
 
     @staticmethod
-    async def add_items(path_to_file: str, add_type: AddType, session: AsyncSession | Session) -> str:
+    def shutdown_parsing_pool():
+        if ItemService.__parsing_pool is not None:
+            ItemService.__parsing_pool.shutdown(cancel_futures=True)
+            ItemService.__parsing_pool = None
+
+    @staticmethod
+    async def __parse_next_batch(file: BinaryIO, add_type: AddType,
+                                 cursor: ImportCursor) -> tuple[list[ItemRow], ImportCursor | None]:
+        loop = asyncio.get_running_loop()
+        window_size = ItemsParser.window_size
+        while True:
+            file.seek(cursor.offset)
+            window = file.read(window_size)
+            is_last = len(window) < window_size
+            batch, next_cursor = await loop.run_in_executor(ItemService.__get_parsing_pool(), ItemsParser.parse_batch,
+                                                            window, is_last, add_type, cursor,
+                                                            config.IMPORT_BATCH_SIZE)
+            if len(batch) > 0 or next_cursor != cursor:
+                return batch, next_cursor
+            # a single item is larger than the window
+            window_size *= 2
+
+    @staticmethod
+    async def add_items(file: BinaryIO, add_type: AddType, cursor: ImportCursor,
+                        session: AsyncSession | Session) -> AsyncIterator[tuple[ImportCursor | None, int, int]]:
+        # the file is parsed in a worker process one batch ahead of the inserts, after every batch this yields
+        # (next cursor or None at the end, added count, skipped duplicates) without committing,
+        # so the caller can store its checkpoint in the same transaction
+        next_batch = asyncio.create_task(ItemService.__parse_next_batch(file, add_type, cursor))
         try:
-            items = []
-            if add_type == AddType.JSON:
-                items += await ItemService.parse_items_json(path_to_file, session)
-            else:
-                items += await ItemService.parse_items_txt(path_to_file, session)
-            await ItemRepository.add_many(items, session)
-            await session_commit(session)
-            return Localizator.get_text(BotEntity.ADMIN, "add_items_success").format(adding_result=len(items))
-        except Exception as e:
-            return Localizator.get_text(BotEntity.ADMIN, "add_items_err").format(adding_result=e)
+            category_ids = {}
+            subcategory_ids = {}
+            while next_batch is not None:
+                batch, cursor = await next_batch
+                next_batch = None
+                if cursor is not None:
+                    next_batch = asyncio.create_task(ItemService.__parse_next_batch(file, add_type, cursor))
+                added_count = 0
+                if len(batch) > 0:
+                    added_count = await ItemService.__add_batch(batch, category_ids, subcategory_ids, session)
+                yield cursor, added_count, len(batch) - added_count
         finally:
-            Path(path_to_file).unlink(missing_ok=True)
+            if next_batch is not None:
+                next_batch.cancel()
+                await asyncio.gather(next_batch, return_exceptions=True)
@@ -0,0 +1,154 @@
+import asyncio
+import datetime
+import gzip
+import logging
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+import config
+from db import get_db_session
+from repositories.balance import BalanceRepository
+
+if config.DB_ENCRYPTION:
+    from sqlcipher3 import dbapi2 as sqlcipher
+
+
+class MaintenanceService:
+    database_path = Path("data") / config.DB_NAME
+    backups_folder = Path("data") / "backups"
+    # pages copied per backup step, writers can commit between two steps
+    backup_step_pages = 1024
+    # a commit between two steps restarts the copy, under steady writes it falls back to a single step
+    backup_step_seconds = 10
+    # rows ANALYZE samples per index, keeps it short on large tables
+    analysis_limit = 1000
+    __task: asyncio.Task | None = None
+
+    @staticmethod
+    def start():
+        if MaintenanceService.__task is None:
+            MaintenanceService.__task = asyncio.create_task(MaintenanceService.__run())
+
+    @staticmethod
+    def __connect(path: Path):
+        if config.DB_ENCRYPTION:
+            connection = sqlcipher.connect(str(path))
+            connection.execute("PRAGMA key = '{}'".format(config.DB_PASS.replace("'", "''")))
+            return connection
+        return sqlite3.connect(path)
+
+    @staticmethod
+    def __copy_database(copy_path: Path, pages: int):
+        copy_path.unlink(missing_ok=True)
+        source = MaintenanceService.__connect(MaintenanceService.database_path)
+        target = MaintenanceService.__connect(copy_path)
+        started_at = time.monotonic()
+
+        def progress(status: int, remaining: int, total: int):
+            if time.monotonic() - started_at > MaintenanceService.backup_step_seconds:
+                raise TimeoutError(f"Backup step budget exceeded, {remaining} of {total} pages remaining")
+            time.sleep(0.01)
+
+        try:
+            source.backup(target, pages=pages, progress=progress if pages > 0 else None)
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def __create_backup(folder: Path) -> Path:
+        # blocking, runs in a worker thread
+        folder.mkdir(parents=True, exist_ok=True)
+        backup_name = f"{MaintenanceService.database_path.stem}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        copy_path = folder / f"{backup_name}.db.tmp"
+        backup_path = folder / f"{backup_name}.db.gz"
+        try:
+            MaintenanceService.__copy_database(copy_path, MaintenanceService.backup_step_pages)
+        except TimeoutError as e:
+            logging.warning(e)
+            # in WAL mode a single step reads one snapshot without blocking writers
+            MaintenanceService.__copy_database(copy_path, -1)
+        if config.DB_ENCRYPTION is False:
+            # compacting the copy instead of the live database keeps the bot's connections out of it
+            compacted_path = folder / f"{backup_name}.db.vacuum"
+            connection = sqlite3.connect(copy_path)
+            try:
+                connection.execute("VACUUM INTO ?", (str(compacted_path),))
+            finally:
+                connection.close()
+            compacted_path.replace(copy_path)
+        with open(copy_path, "rb") as copy_file, gzip.open(backup_path, "wb") as backup_file:
+            shutil.copyfileobj(copy_file, backup_file, 1024 * 1024)
+        copy_path.unlink()
+        return backup_path
+
+    @staticmethod
+    def __get_scheduled_backups() -> list[Path]:
+        # oldest first, the names end with the creation time
+        return sorted(MaintenanceService.backups_folder.glob(f"{MaintenanceService.database_path.stem}_*.db.gz"))
+
+    @staticmethod
+    def __is_backup_due() -> bool:
+        # blocking, runs in a worker thread.
+        # The schedule follows the newest backup on disk, so restarts of the bot don't postpone it
+        if config.BACKUP_INTERVAL_HOURS <= 0:
+            return False
+        backups = MaintenanceService.__get_scheduled_backups()
+        if len(backups) == 0:
+            return True
+        backup_age = time.time() - backups[-1].stat().st_mtime
+        return backup_age >= config.BACKUP_INTERVAL_HOURS * 60 * 60
+
+    @staticmethod
+    def __create_scheduled_backup() -> Path:
+        # blocking, runs in a worker thread
+        backup_path = MaintenanceService.__create_backup(MaintenanceService.backups_folder)
+        # the newest backup is always kept, it is the one the schedule is based on
+        backup_keep = max(config.BACKUP_KEEP, 1)
+        for old_backup in MaintenanceService.__get_scheduled_backups()[:-backup_keep]:
+            old_backup.unlink()
+        return backup_path
+
+    @staticmethod
+    def __optimize(analyze: bool):
+        # blocking, runs in a worker thread
+        connection = MaintenanceService.__connect(MaintenanceService.database_path)
+        try:
+            connection.execute(f"PRAGMA analysis_limit = {MaintenanceService.analysis_limit}")
+            if analyze:
+                connection.execute("ANALYZE")
+            connection.execute("PRAGMA optimize")
+        finally:
+            connection.close()
+
+    @staticmethod
+    async def create_backup(folder: Path) -> Path:
+        # an on-demand backup into a folder of the caller, it is not part of the scheduled backups and their rotation
+        return await asyncio.to_thread(MaintenanceService.__create_backup, folder)
+
+    @staticmethod
+    async def reconcile_balances():
+        async with get_db_session() as session:
+            mismatches = await BalanceRepository.get_mismatches(session)
+        for mismatch in mismatches:
+            logging.warning(f"Balance of user {mismatch.user_id} differs from the ledger: "
+                            f"top up {mismatch.top_up_amount} != {mismatch.ledger_top_up_amount}, "
+                            f"consumed {mismatch.consume_records} != {mismatch.ledger_consume_records}")
+
+    @staticmethod
+    async def __run():
+        # PRAGMA optimize every hour and on start, ANALYZE, a backup and a balance reconciliation
+        # once the newest backup is BACKUP_INTERVAL_HOURS old, an overdue backup is taken right after a start
+        while True:
+            try:
+                is_backup_due = await asyncio.to_thread(MaintenanceService.__is_backup_due)
+                await asyncio.to_thread(MaintenanceService.__optimize, is_backup_due)
+                if is_backup_due:
+                    backup_path = await asyncio.to_thread(MaintenanceService.__create_scheduled_backup)
+                    logging.info(f"Database backup created: {backup_path}")
+                    await MaintenanceService.reconcile_balances()
+            except Exception:
+                logging.exception("Database maintenance failed")
+            await asyncio.sleep(60 * 60)
@@ -9,13 +9,16 @@ from sqlalchemy.orm import Session
 
 from config import ADMIN_ID_LIST, TOKEN
 from enums.bot_entity import BotEntity
+from enums.outbox_method import OutboxMethod
 from models.buy import RefundDTO
 from models.cartItem import CartItemDTO
 from models.item import ItemDTO
+from models.outboxMessage import OutboxMessageDTO
 from models.payment import ProcessingPaymentDTO, TablePaymentDTO
 from models.user import UserDTO
 from repositories.category import CategoryRepository
 from repositories.item import ItemRepository
+from repositories.outbox import OutboxRepository
 from repositories.subcategory import SubcategoryRepository
 from utils.localizator import Localizator
 
@@ -44,27 +47,26 @@ class NotificationService:
         await bot.session.close()
 
     @staticmethod
-    async def send_to_user(message: str, telegram_id: int):
-        bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-        try:
-            await bot.send_message(telegram_id, message)
-        except Exception as e:
-            logging.error(e)
-        finally:
-            await bot.session.close()
+    def to_user(text: str, telegram_id: int) -> OutboxMessageDTO:
+        return OutboxMessageDTO(method=OutboxMethod.SEND_MESSAGE, chat_id=telegram_id, text=text)
 
     @staticmethod
-    async def edit_message(message: str, source_message_id: int, chat_id: int):
-        bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-        try:
-            await bot.edit_message_text(text=message, chat_id=chat_id, message_id=source_message_id)
-        except Exception as e:
-            logging.error(e)
-        finally:
-            await bot.session.close()
+    def to_admins(text: str, reply_markup: InlineKeyboardMarkup | None) -> list[OutboxMessageDTO]:
+        if reply_markup is not None and len(reply_markup.inline_keyboard) > 0:
+            reply_markup = reply_markup.model_dump_json(exclude_none=True)
+        else:
+            reply_markup = None
+        return [OutboxMessageDTO(method=OutboxMethod.SEND_MESSAGE, chat_id=admin_id, text=f"<b>{text}</b>",
+                                 reply_markup=reply_markup) for admin_id in ADMIN_ID_LIST]
+
+    @staticmethod
+    def edit_payment_message(text: str, table_payment_dto: TablePaymentDTO, telegram_id: int) -> OutboxMessageDTO:
+        return OutboxMessageDTO(method=OutboxMethod.EDIT_MESSAGE, chat_id=telegram_id,
+                                message_id=table_payment_dto.message_id, text=text)
 
     @staticmethod
-    async def payment_expired(user_dto: UserDTO, payment_dto: ProcessingPaymentDTO, table_payment_dto: TablePaymentDTO):
+    async def payment_expired(user_dto: UserDTO, payment_dto: ProcessingPaymentDTO, table_payment_dto: TablePaymentDTO,
+                              session: AsyncSession | Session):
         msg = Localizator.get_text(BotEntity.USER, "notification_payment_expired").format(
             payment_id=payment_dto.id
         )
@@ -76,19 +78,19 @@ class NotificationService:
             currency_text=Localizator.get_currency_text(),
             status=Localizator.get_text(BotEntity.USER, "status_expired")
         )
-        await NotificationService.edit_message(edited_payment_message, table_payment_dto.message_id,
-                                               user_dto.telegram_id)
-        await NotificationService.send_to_user(msg, user_dto.telegram_id)
+        await OutboxRepository.add_many([
+            NotificationService.edit_payment_message(edited_payment_message, table_payment_dto, user_dto.telegram_id),
+            NotificationService.to_user(msg, user_dto.telegram_id)], session)
 
     @staticmethod
-    async def new_deposit(payment_dto: ProcessingPaymentDTO, user_dto: UserDTO, table_payment_dto: TablePaymentDTO):
+    async def new_deposit(payment_dto: ProcessingPaymentDTO, user_dto: UserDTO, table_payment_dto: TablePaymentDTO,
+                          session: AsyncSession | Session):
         user_button = await NotificationService.make_user_button(user_dto.telegram_username)
         user_notification_msg = Localizator.get_text(BotEntity.USER, "notification_new_deposit").format(
             fiat_amount=payment_dto.fiatAmount,
             currency_text=Localizator.get_currency_text(),
             payment_id=payment_dto.id
         )
-        await NotificationService.send_to_user(user_notification_msg, user_dto.telegram_id)
         edited_payment_message = Localizator.get_text(BotEntity.USER, "top_up_balance_msg").format(
             crypto_name=payment_dto.cryptoCurrency.name,
             addr="***",
@@ -97,8 +99,6 @@ class NotificationService:
             currency_text=Localizator.get_currency_text(),
             status=Localizator.get_text(BotEntity.USER, "status_paid")
         )
-        await NotificationService.edit_message(edited_payment_message, table_payment_dto.message_id,
-                                               user_dto.telegram_id)
         if user_dto.telegram_username:
             message = Localizator.get_text(BotEntity.ADMIN, "notification_new_deposit_username").format(
                 username=user_dto.telegram_username,
@@ -115,7 +115,10 @@ class NotificationService:
                 value=payment_dto.cryptoAmount,
                 crypto_name=payment_dto.cryptoCurrency.name
             )
-        await NotificationService.send_to_admins(message, user_button)
+        await OutboxRepository.add_many([
+            NotificationService.to_user(user_notification_msg, user_dto.telegram_id),
+            NotificationService.edit_payment_message(edited_payment_message, table_payment_dto, user_dto.telegram_id),
+            *NotificationService.to_admins(message, user_button)], session)
 
     @staticmethod
     async def new_buy(sold_items: list[CartItemDTO], user: UserDTO, session: AsyncSession | Session):
@@ -147,18 +150,14 @@ class NotificationService:
                     currency_sym=Localizator.get_currency_symbol()) + "\n"
         message += Localizator.get_text(BotEntity.USER, "cart_grand_total_string").format(
             cart_grand_total=cart_grand_total, currency_sym=Localizator.get_currency_symbol())
-        await NotificationService.send_to_admins(message, user_button)
+        await OutboxRepository.add_many(NotificationService.to_admins(message, user_button), session)
 
     @staticmethod
-    async def refund(refund_data: RefundDTO):
+    async def refund(refund_data: RefundDTO, session: AsyncSession | Session):
         user_notification = Localizator.get_text(BotEntity.USER, "refund_notification").format(
             total_price=refund_data.total_price,
             quantity=refund_data.quantity,
             subcategory=refund_data.subcategory_name,
             currency_sym=Localizator.get_currency_symbol())
-        try:
-            bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-            await bot.send_message(refund_data.telegram_id, text=user_notification)
-            await bot.session.close()
-        except Exception as _:
-            pass
+        await OutboxRepository.add_many([NotificationService.to_user(user_notification, refund_data.telegram_id)],
+                                        session)
@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+
+from db import get_db_session, session_commit
+from enums.outbox_method import OutboxMethod
+from models.outboxMessage import OutboxMessageDTO
+from repositories.outbox import OutboxRepository
+
+
+class OutboxService:
+    batch_size = 100
+    poll_seconds = 1
+    # Telegram allows about one message per second in a chat and 30 per second overall
+    chat_interval_seconds = 1
+    send_interval_seconds = 1 / 30
+    max_attempts = 10
+    max_backoff_seconds = 60 * 60
+    __task: asyncio.Task | None = None
+    __chat_sent_at: dict[int, float] = {}
+
+    @staticmethod
+    def start(bot: Bot):
+        # messages left by a restart are still due, so they are picked up by the first batch
+        if OutboxService.__task is None:
+            OutboxService.__task = asyncio.create_task(OutboxService.__run(bot))
+
+    @staticmethod
+    async def __send(bot: Bot, outbox_message: OutboxMessageDTO):
+        match outbox_message.method:
+            case OutboxMethod.SEND_MESSAGE:
+                reply_markup = None
+                if outbox_message.reply_markup is not None:
+                    reply_markup = InlineKeyboardMarkup.model_validate_json(outbox_message.reply_markup)
+                await bot.send_message(outbox_message.chat_id, outbox_message.text, reply_markup=reply_markup)
+            case OutboxMethod.EDIT_MESSAGE:
+                await bot.edit_message_text(text=outbox_message.text, chat_id=outbox_message.chat_id,
+                                            message_id=outbox_message.message_id)
+
+    @staticmethod
+    def __get_retry_datetime(outbox_message: OutboxMessageDTO) -> datetime.datetime | None:
+        if outbox_message.attempts >= OutboxService.max_attempts:
+            return None
+        backoff_seconds = min(2 ** outbox_message.attempts, OutboxService.max_backoff_seconds)
+        return datetime.datetime.now() + datetime.timedelta(seconds=backoff_seconds)
+
+    @staticmethod
+    async def __dispatch(bot: Bot) -> int:
+        # every sent message is deleted and committed right away, a restart resends at most the one in flight
+        now = time.monotonic()
+        OutboxService.__chat_sent_at = {chat_id: sent_at for chat_id, sent_at in OutboxService.__chat_sent_at.items()
+                                        if now - sent_at < OutboxService.chat_interval_seconds}
+        attempted_count = 0
+        async with get_db_session() as session:
+            outbox_messages = await OutboxRepository.get_due(OutboxService.batch_size, session)
+            limited_chats = set()
+            for outbox_message in outbox_messages:
+                if outbox_message.chat_id in limited_chats:
+                    continue
+                sent_at = OutboxService.__chat_sent_at.get(outbox_message.chat_id)
+                if sent_at is not None and time.monotonic() - sent_at < OutboxService.chat_interval_seconds:
+                    # the rest of this chat waits for the next batch and keeps its order
+                    limited_chats.add(outbox_message.chat_id)
+                    continue
+                attempted_count += 1
+                try:
+                    await OutboxService.__send(bot, outbox_message)
+                    await OutboxRepository.delete(outbox_message.id, session)
+                except TelegramRetryAfter as e:
+                    limited_chats.add(outbox_message.chat_id)
+                    outbox_message.next_attempt_datetime = (datetime.datetime.now() +
+                                                            datetime.timedelta(seconds=e.retry_after))
+                    outbox_message.error = e.message
+                    await OutboxRepository.reschedule(outbox_message, session)
+                except (TelegramForbiddenError, TelegramBadRequest) as e:
+                    # blocked bot, deleted chat or deleted message, a retry can't succeed
+                    logging.warning(f"Outbox message {outbox_message.id} given up: {e.message}")
+                    outbox_message.attempts += 1
+                    outbox_message.next_attempt_datetime = None
+                    outbox_message.error = e.message
+                    await OutboxRepository.reschedule(outbox_message, session)
+                except Exception as e:
+                    logging.warning(f"Outbox message {outbox_message.id} failed: {e}")
+                    limited_chats.add(outbox_message.chat_id)
+                    outbox_message.attempts += 1
+                    outbox_message.next_attempt_datetime = OutboxService.__get_retry_datetime(outbox_message)
+                    outbox_message.error = str(e)
+                    await OutboxRepository.reschedule(outbox_message, session)
+                await session_commit(session)
+                OutboxService.__chat_sent_at[outbox_message.chat_id] = time.monotonic()
+                await asyncio.sleep(OutboxService.send_interval_seconds)
+        return attempted_count
+
+    @staticmethod
+    async def __run(bot: Bot):
+        while True:
+            try:
+                attempted_count = await OutboxService.__dispatch(bot)
+            except Exception:
+                logging.exception("Outbox dispatch failed")
+                attempted_count = 0
+            if attempted_count < OutboxService.batch_size:
+                await asyncio.sleep(OutboxService.poll_seconds)
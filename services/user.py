@@ -7,13 +7,9 @@ from callbacks import MyProfileCallback
 from db import session_commit
 from enums.bot_entity import BotEntity
 from enums.cryptocurrency import Cryptocurrency
-from handlers.common.common import add_pagination_buttons
+from handlers.common.common import add_keyset_pagination_buttons
 from models.user import User, UserDTO
 from repositories.buy import BuyRepository
-from repositories.buyItem import BuyItemRepository
-from repositories.cart import CartRepository
-from repositories.item import ItemRepository
-from repositories.subcategory import SubcategoryRepository
 from repositories.user import UserRepository
 from utils.localizator import Localizator
 
@@ -22,18 +18,9 @@ class UserService:
 
     @staticmethod
     async def create_if_not_exist(user_dto: UserDTO, session: AsyncSession | Session) -> None:
-        user = await UserRepository.get_by_tgid(user_dto.telegram_id, session)
-        match user:
-            case None:
-                user_id = await UserRepository.create(user_dto, session)
-                await CartRepository.get_or_create(user_id, session)
-                await session_commit(session)
-            case _:
-                update_user_dto = UserDTO(**user.model_dump())
-                update_user_dto.can_receive_messages = True
-                update_user_dto.telegram_username = user_dto.telegram_username
-                await UserRepository.update(update_user_dto, session)
-                await session_commit(session)
+        # the cart is created lazily by CartRepository.get_or_create on first use
+        await UserRepository.upsert(user_dto, session)
+        await session_commit(session)
 
     @staticmethod
     async def get(user_dto: UserDTO, session: AsyncSession | Session) -> User | None:
@@ -86,25 +73,21 @@ class UserService:
             -> tuple[str, InlineKeyboardBuilder]:
         unpacked_cb = MyProfileCallback.unpack(callback.data)
         user = await UserRepository.get_by_tgid(callback.from_user.id, session)
-        buys = await BuyRepository.get_by_buyer_id(user.id, unpacked_cb.page, session)
+        purchases, purchases_page = await BuyRepository.get_purchase_history(user.id, unpacked_cb.page, session)
         kb_builder = InlineKeyboardBuilder()
-        for buy in buys:
-            buy_item = await BuyItemRepository.get_single_by_buy_id(buy.id, session)
-            item = await ItemRepository.get_by_id(buy_item.item_id, session)
-            subcategory = await SubcategoryRepository.get_by_id(item.subcategory_id, session)
+        for purchase in purchases:
             kb_builder.button(text=Localizator.get_text(BotEntity.USER, "purchase_history_item").format(
-                subcategory_name=subcategory.name,
-                total_price=buy.total_price,
-                quantity=buy.quantity,
+                subcategory_name=purchase.subcategory_name,
+                total_price=purchase.total_price,
+                quantity=purchase.quantity,
                 currency_sym=Localizator.get_currency_symbol()),
                 callback_data=MyProfileCallback.create(
                     unpacked_cb.level + 1,
-                    args_for_action=buy.id
+                    args_for_action=purchase.buy_id
                 ))
         kb_builder.adjust(1)
-        kb_builder = await add_pagination_buttons(kb_builder, unpacked_cb,
-                                                  BuyRepository.get_max_page_purchase_history(user.id, session),
-                                                  unpacked_cb.get_back_button(0))
+        kb_builder = await add_keyset_pagination_buttons(kb_builder, unpacked_cb, purchases_page,
+                                                         unpacked_cb.get_back_button(0))
         if len(kb_builder.as_markup().inline_keyboard) > 1:
             return Localizator.get_text(BotEntity.USER, "purchases"), kb_builder
         else:
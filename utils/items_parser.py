@@ -0,0 +1,101 @@
+import codecs
+import io
+import json
+import re
+from typing import Iterator, NamedTuple
+
+from callbacks import AddType
+
+# (category_name, subcategory_name, description, price, private_data)
+ItemRow = tuple[str, str, str, float, str]
+
+
+class ImportCursor(NamedTuple):
+    # byte offset in the file and number of the last parsed line (TXT) or array element (JSON)
+    offset: int = 0
+    number: int = 0
+
+
+class ItemsParser:
+    window_size = 1024 * 1024
+    separators = re.compile(r"[\s,]*")
+
+    @staticmethod
+    def parse_batch(window: bytes, is_last: bool, add_type: AddType, cursor: ImportCursor,
+                    batch_size: int) -> tuple[list[ItemRow], ImportCursor | None]:
+        # runs in a worker process on the bytes of the file starting at cursor.offset, returns up to batch_size
+        # validated rows and the cursor of the next batch, an item cut off by the end of the window is left for it
+        if add_type == AddType.JSON:
+            parsed_rows = ItemsParser.parse_json(window, is_last, cursor)
+        else:
+            parsed_rows = ItemsParser.parse_txt(window, is_last, cursor)
+        rows = []
+        next_cursor = cursor
+        for row, next_cursor in parsed_rows:
+            rows.append(row)
+            if len(rows) == batch_size:
+                return rows, next_cursor
+        if is_last:
+            return rows, None
+        return rows, next_cursor
+
+    @staticmethod
+    def parse_txt(window: bytes, is_last: bool, cursor: ImportCursor) -> Iterator[tuple[ItemRow, ImportCursor]]:
+        offset, line_number = cursor
+        for raw_line in io.BytesIO(window):
+            if not is_last and not raw_line.endswith(b"\n"):
+                return
+            offset += len(raw_line)
+            line_number += 1
+            line = raw_line.decode('utf-8').rstrip("\r\n")
+            if len(line.strip()) == 0:
+                continue
+            try:
+                category_name, subcategory_name, description, price, private_data = line.split(';', 4)
+                row = category_name, subcategory_name, description, float(price), private_data
+            except ValueError as e:
+                raise ValueError(f"line {line_number}: {e}")
+            yield row, ImportCursor(offset, line_number)
+
+    @staticmethod
+    def parse_json(window: bytes, is_last: bool, cursor: ImportCursor) -> Iterator[tuple[ItemRow, ImportCursor]]:
+        for item, next_cursor in ItemsParser.iterate_json_array(window, is_last, cursor):
+            try:
+                row = (item['category'], item['subcategory'], item['description'], float(item['price']),
+                       item['private_data'])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"item {next_cursor.number}: {e!r}")
+            yield row, next_cursor
+
+    @staticmethod
+    def iterate_json_array(window: bytes, is_last: bool, cursor: ImportCursor) -> Iterator[tuple[dict, ImportCursor]]:
+        # decodes the top-level array element by element, byte offsets are counted on the consumed text
+        # so the next window can start right behind the last complete element
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')().decode(window, final=is_last)
+        offset, number = cursor
+        position = 0
+        if number == 0:
+            position = ItemsParser.separators.match(text).end()
+            if text[position:position + 1] != "[":
+                raise ValueError("JSON file must contain an array of items")
+            position += 1
+        counted_position = 0
+        while True:
+            position = ItemsParser.separators.match(text, position).end()
+            if position == len(text):
+                if is_last:
+                    raise ValueError("JSON array is not closed")
+                return
+            if text[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(text, position)
+            except json.JSONDecodeError:
+                if is_last:
+                    raise
+                return
+            number += 1
+            offset += len(text[counted_position:position].encode('utf-8'))
+            counted_position = position
+            yield item, ImportCursor(offset, number)
@@ -0,0 +1,41 @@
+from typing import NamedTuple, Callable, Any
+
+from sqlalchemy import Select, ColumnElement
+
+import config
+
+
+class KeysetPage(NamedTuple):
+    # values for the "page" field of the callback, None where there is no page in that direction
+    previous_key: int | None
+    next_key: int | None
+
+
+# The "page" field of a keyset-paginated callback holds a key instead of a page number:
+# 0 is the first page (newest rows), a positive key continues with the rows older than it,
+# a negative key goes back to the rows newer than its absolute value.
+# One extra row is fetched as a probe for the next page, so no COUNT is needed.
+def keyset_seek(stmt: Select, key_column: ColumnElement, key: int) -> Select:
+    if key > 0:
+        stmt = stmt.where(key_column < key).order_by(key_column.desc())
+    elif key < 0:
+        stmt = stmt.where(key_column > -key).order_by(key_column.asc())
+    else:
+        stmt = stmt.order_by(key_column.desc())
+    return stmt.limit(config.PAGE_ENTRIES + 1)
+
+
+def keyset_page(rows: list, key: int, get_key: Callable[[Any], int]) -> tuple[list, KeysetPage]:
+    has_more = len(rows) > config.PAGE_ENTRIES
+    rows = rows[:config.PAGE_ENTRIES]
+    if key < 0:
+        rows.reverse()
+    if len(rows) == 0:
+        return rows, KeysetPage(None, None)
+    if key < 0:
+        # we came back from an older page, so it still exists
+        has_previous, has_next = has_more, True
+    else:
+        has_previous, has_next = key > 0, has_more
+    return rows, KeysetPage(-get_key(rows[0]) if has_previous else None,
+                            get_key(rows[-1]) if has_next else None)
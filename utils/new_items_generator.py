@@ -19,7 +19,8 @@ class NewItemsGenerator:
         items_list = list()
         with open(filepath, "r") as f:
             for line in f.readlines():
-                items_list.append(ItemDTO(category, subcategory, line.strip(), price, description))
+                items_list.append(ItemDTO(category_id=category, subcategory_id=subcategory, private_data=line.strip(),
+                                          price=price, description=description))
             return items_list
 
     @staticmethod
@@ -27,7 +28,8 @@ class NewItemsGenerator:
                                     description: str):
         items_list = list()
         for i in range(count):
-            items_list.append(ItemDTO(category, subcategory, "Contact Admin", price, description))
+            items_list.append(ItemDTO(category_id=category, subcategory_id=subcategory, private_data="Contact Admin",
+                                      price=price, description=description))
         return items_list
 
 
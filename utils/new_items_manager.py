@@ -1,54 +1,58 @@
-from typing import List
-
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from enums.bot_entity import BotEntity
-from models.item import ItemDTO
-from repositories.category import CategoryRepository
-from repositories.subcategory import SubcategoryRepository
+from models.item import ItemStockDTO
 from services.item import ItemService
 from utils.localizator import Localizator
 
 
 class NewItemsManager:
+    # Telegram limit for the text of a single message, in UTF-16 code units
+    max_message_length = 4096
 
     @staticmethod
-    async def generate_restocking_message(session: AsyncSession | Session):
-        new_items = await ItemService.get_new(session)
-        message = await NewItemsManager.create_text_of_items_msg(new_items, True, session)
-        return message
+    async def generate_restocking_message(session: AsyncSession | Session) -> list[str]:
+        new_stock = await ItemService.get_new_stock(session)
+        return NewItemsManager.create_text_of_items_msg(new_stock, True)
 
     @staticmethod
-    async def generate_in_stock_message(session: AsyncSession | Session):
-        items = await ItemService.get_in_stock_items(session)
-        message = await NewItemsManager.create_text_of_items_msg(items, False, session)
-        return message
+    async def generate_in_stock_message(session: AsyncSession | Session) -> list[str]:
+        stock = await ItemService.get_in_stock(session)
+        return NewItemsManager.create_text_of_items_msg(stock, False)
 
     @staticmethod
-    async def create_text_of_items_msg(items: List[ItemDTO], is_update: bool, session: AsyncSession | Session) -> str:
-        filtered_items = {}
-        for item in items:
-            category = await CategoryRepository.get_by_id(item.category_id, session)
-            subcategory = await SubcategoryRepository.get_by_id(item.subcategory_id, session)
-            if category.name not in filtered_items:
-                filtered_items[category.name] = {}
-            if subcategory.name not in filtered_items[category.name]:
-                filtered_items[category.name][subcategory.name] = []
-            filtered_items[category.name][subcategory.name].append(item)
-        message = "<b>"
+    def create_text_of_items_msg(stock: list[ItemStockDTO], is_update: bool) -> list[str]:
         if is_update is True:
-            message += Localizator.get_text(BotEntity.ADMIN, "restocking_message_header")
-        elif is_update is False:
-            message += Localizator.get_text(BotEntity.ADMIN, "current_stock_header")
-        for category, subcategory_item_dict in filtered_items.items():
-            message += Localizator.get_text(BotEntity.ADMIN, "restocking_message_category").format(
-                category=category)
-            for subcategory, item in subcategory_item_dict.items():
-                message += Localizator.get_text(BotEntity.USER, "subcategory_button").format(
-                    subcategory_name=subcategory,
-                    available_quantity=len(item),
-                    subcategory_price=item[0].price,
-                    currency_sym=Localizator.get_currency_symbol()) + "\n"
-        message += "</b>"
-        return message
+            lines = [Localizator.get_text(BotEntity.ADMIN, "restocking_message_header")]
+        else:
+            lines = [Localizator.get_text(BotEntity.ADMIN, "current_stock_header")]
+        current_category = None
+        for subcategory_stock in stock:
+            if subcategory_stock.category_name != current_category:
+                current_category = subcategory_stock.category_name
+                lines.append(Localizator.get_text(BotEntity.ADMIN, "restocking_message_category").format(
+                    category=current_category))
+            lines.append(Localizator.get_text(BotEntity.USER, "subcategory_button").format(
+                subcategory_name=subcategory_stock.subcategory_name,
+                available_quantity=subcategory_stock.quantity,
+                subcategory_price=subcategory_stock.price,
+                currency_sym=Localizator.get_currency_symbol()) + "\n")
+        return NewItemsManager.split_message(lines)
+
+    @staticmethod
+    def split_message(lines: list[str]) -> list[str]:
+        # every message gets its own <b></b> pair, so lines are never split inside the markup
+        messages = []
+        message_lines = []
+        message_length = len("<b></b>")
+        for line in lines:
+            line_length = len(line.encode('utf-16-le')) // 2
+            if len(message_lines) > 0 and message_length + line_length > NewItemsManager.max_message_length:
+                messages.append("<b>" + "".join(message_lines) + "</b>")
+                message_lines = []
+                message_length = len("<b></b>")
+            message_lines.append(line)
+            message_length += line_length
+        messages.append("<b>" + "".join(message_lines) + "</b>")
+        return messages